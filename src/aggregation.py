@@ -0,0 +1,133 @@
+"""
+Local Aggregation Module.
+Turns day-level metric rows into period totals, rate metrics and comparison
+periods locally, so comparison periods never need their own API queries.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+# How the comparison period is chosen for a current period:
+#   previous        - the period of equal length immediately before
+#   yoy             - the same dates 52 weeks earlier (weekday-aligned)
+#   rolling-4-week  - the 28 days before, scaled to the current period's length
+COMPARISON_MODES = ('previous', 'yoy', 'rolling-4-week')
+
+
+def comparison_range(current_range: tuple[str, str], mode: str = 'previous') -> tuple[tuple[str, str], float]:
+    """
+    Get the comparison period for a current period.
+
+    Args:
+        current_range: (start, end) of the current period (YYYY-MM-DD)
+        mode: One of COMPARISON_MODES
+
+    Returns:
+        ((start, end), scale) where scale converts additive totals of the
+        comparison period to the length of the current period.
+    """
+    start = datetime.strptime(current_range[0], '%Y-%m-%d').date()
+    end = datetime.strptime(current_range[1], '%Y-%m-%d').date()
+    period_days = (end - start).days + 1
+
+    if mode == 'previous':
+        compare_end = start - timedelta(days=1)
+        compare_start = compare_end - timedelta(days=period_days - 1)
+        scale = 1.0
+    elif mode == 'yoy':
+        compare_start = start - timedelta(weeks=52)
+        compare_end = end - timedelta(weeks=52)
+        scale = 1.0
+    elif mode == 'rolling-4-week':
+        compare_end = start - timedelta(days=1)
+        compare_start = compare_end - timedelta(days=27)
+        scale = period_days / 28
+    else:
+        raise ValueError(f"Unknown comparison mode: {mode} (expected one of {', '.join(COMPARISON_MODES)})")
+
+    return (compare_start.strftime('%Y-%m-%d'), compare_end.strftime('%Y-%m-%d')), scale
+
+
+def covering_spans(ranges: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Merge date ranges that overlap or touch into the fewest spans covering them all."""
+    spans = []
+    for start, end in sorted(ranges):
+        if spans:
+            last_end = datetime.strptime(spans[-1][1], '%Y-%m-%d').date()
+            if datetime.strptime(start, '%Y-%m-%d').date() <= last_end + timedelta(days=1):
+                spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+                continue
+        spans.append((start, end))
+    return spans
+
+
+class DailySeries:
+    """
+    Column-oriented day-level metrics backed by typed arrays.
+
+    Each column keeps a running (prefix) sum, so the total for any date range
+    is one subtraction per column regardless of how many days it covers.
+    """
+
+    def __init__(self, rows: list[dict], columns):
+        """
+        Build the series from day-level rows.
+
+        Args:
+            rows: Dicts with a 'date' key (YYYY-MM-DD) and one key per column
+            columns: Metric column names to aggregate
+        """
+        rows = sorted(rows, key=lambda row: row['date'])
+        self.dates = [row['date'] for row in rows]
+        self._prefix_sums = {
+            column: array('d', accumulate((float(row[column]) for row in rows), initial=0.0))
+            for column in columns
+        }
+
+    def totals(self, start_date: str, end_date: str, scale: float = 1.0) -> dict:
+        """Sum every column over a date range, optionally scaled."""
+        lo = bisect_left(self.dates, start_date)
+        hi = bisect_right(self.dates, end_date)
+        return {
+            column: (sums[hi] - sums[lo]) * scale
+            for column, sums in self._prefix_sums.items()
+        }
+
+
+def ga4_overview_values(totals: dict, active_users: float) -> dict:
+    """Derive GA4 overview metrics from summed day-level columns."""
+    sessions = totals['sessions']
+    engaged_sessions = totals['engaged_sessions']
+    return {
+        'activeUsers': active_users,
+        'sessions': sessions,
+        'bounceRate': 1 - engaged_sessions / sessions if sessions else 0.0,
+        'averageSessionDuration': totals['session_duration'] / sessions if sessions else 0.0,
+        'screenPageViews': totals['screen_page_views'],
+        'newUsers': totals['new_users'],
+        'engagementRate': engaged_sessions / sessions if sessions else 0.0,
+    }
+
+
+def gsc_overview_row(totals: dict) -> dict:
+    """Derive a Search Analytics aggregate row from summed day-level columns."""
+    impressions = totals['impressions']
+    # Clicks and impressions are counts, reported as integers like the API's aggregate rows
+    return {
+        'clicks': round(totals['clicks']),
+        'impressions': round(impressions),
+        'ctr': totals['clicks'] / impressions if impressions else 0.0,
+        'position': totals['weighted_position'] / impressions if impressions else 0.0,
+    }
+
+
+def scale_values(values: dict, scale: float, rate_metrics) -> dict:
+    """Scale additive metrics to another period length, leaving rate metrics as-is."""
+    if scale == 1.0:
+        return values
+    return {
+        name: value if name in rate_metrics else value * scale
+        for name, value in values.items()
+    }
@@ -3,42 +3,153 @@ Gemini AI Analyzer Module.
 Uses Google Gemini to analyze website data and generate actionable insights.
 """
 
+import hashlib
+import itertools
 import json
+import re
+import threading
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
+from typing import Iterator, Optional
 from google import genai
+from google.genai import errors as genai_errors
 from google.genai import types
 
-from src.config import GEMINI_API_KEY, GEMINI_MODEL, PROJECT_ROOT
+from src.analyzers.prompt_budget import TABLES, estimate_tokens, fit_to_budget
+from src.analyzers.rendering import (
+    DATA_TABLES_TEMPLATE,
+    TEMPLATES_DIR,
+    VERIFICATION_FOOTER_TEMPLATE,
+    PromptTemplate,
+    load_prompt_template,
+    parse_prompt_template,
+    render,
+)
+from src.cache import ResponseCache, fingerprint
+from src.concurrency import run_all_or_raise
+from src.config import (
+    GEMINI_API_KEY,
+    GEMINI_CONTEXT_CACHE,
+    GEMINI_CONTEXT_CACHE_TTL,
+    GEMINI_MODEL,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_MB,
+    PROMPT_TOKEN_BUDGET,
+    PROMPT_TOKEN_COUNTER,
+    SECTION_CONCURRENCY,
+)
+from src.retry import call_with_retry
 
 
 # Load analysis prompt template
-PROMPT_TEMPLATE_PATH = PROJECT_ROOT / 'templates' / 'analysis_prompt.md'
+PROMPT_TEMPLATE_PATH = TEMPLATES_DIR / 'analysis_prompt.md'
+
+# Generation settings for the analysis; part of the response cache key
+GENERATION_CONFIG = {
+    'temperature': 0.2,  # Lower temperature for more factual output
+    'top_p': 0.8,
+    'max_output_tokens': 8000,
+}
+
+# Data blocks (by <!-- NAME-START --> marker) fed to each report section in sectional
+# mode, matched by a keyword in the section heading; other sections get every block
+SECTION_DATA_BLOCKS = {
+    '执行摘要': ['GA4-OVERVIEW', 'GSC-OVERVIEW'],
+    '流量分析': ['GA4-OVERVIEW', 'GA4-SOURCES', 'GA4-DEVICES', 'GA4-GEO'],
+    'SEO': ['GSC-OVERVIEW', 'GSC-QUERIES', 'GSC-PAGES', 'GSC-OPPORTUNITIES'],
+    '页面表现': ['GA4-PAGES', 'GSC-PAGES'],
+    '用户分群': ['GA4-OVERVIEW', 'GA4-DEVICES', 'GA4-GEO', 'GSC-DEVICES', 'GSC-COUNTRIES'],
+    '下周关注': ['GA4-OVERVIEW', 'GSC-OVERVIEW', 'GSC-OPPORTUNITIES'],
+}
+
+# Heading of the template part listing the report sections
+FRAMEWORK_HEADING = '## 分析框架'
+
+# Registered prompt preambles: (model, preamble hash) -> cached content name,
+# or None when registration failed (e.g. the preamble is below the model's minimum size)
+_context_caches = {}
+_context_caches_lock = threading.Lock()
 
 
 class GeminiAnalyzer:
     """Analyzes website data using Gemini AI."""
     
-    def __init__(self, api_key: str = None, model: str = None):
+    def __init__(self, api_key: str = None, model: str = None, use_cache: bool = None,
+                 use_context_cache: bool = None):
         """
         Initialize the Gemini Analyzer.
         
         Args:
             api_key: Gemini API key
             model: Model name to use (default: gemini-1.5-pro)
+            use_cache: Serve identical prompts from the on-disk Gemini response cache
+                (default: LLM_CACHE_ENABLED)
+            use_context_cache: Register the static prompt preamble through the Gemini
+                cached-content API and send only the data with each call
+                (default: GEMINI_CONTEXT_CACHE == '1')
         """
         self.api_key = api_key or GEMINI_API_KEY
         self.model_name = model or GEMINI_MODEL
         
+        if use_cache is None:
+            use_cache = LLM_CACHE_ENABLED
+        self.response_cache = ResponseCache('gemini', max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024) if use_cache else None
+        
+        if use_context_cache is None:
+            use_context_cache = GEMINI_CONTEXT_CACHE == '1'
+        self.use_context_cache = use_context_cache
+        
         # Initialize the client
         self.client = genai.Client(api_key=self.api_key)
     
-    def _load_prompt_template(self) -> str:
-        """Load the analysis prompt template."""
-        if PROMPT_TEMPLATE_PATH.exists():
-            return PROMPT_TEMPLATE_PATH.read_text(encoding='utf-8')
+    def _load_prompt_template(self) -> PromptTemplate:
+        """Load the analysis prompt template (parsed once, reloaded when the file changes)."""
+        template = load_prompt_template(PROMPT_TEMPLATE_PATH)
+        if template is not None:
+            return template
         else:
-            return self._get_default_prompt_template()
+            return parse_prompt_template(self._get_default_prompt_template())
+    
+    def _static_preamble(self) -> str:
+        """Get the fixed instructions the template places before the {data} tables."""
+        return self._load_prompt_template().preamble()
+    
+    def _context_cache_name(self, preamble: str) -> Optional[str]:
+        """
+        Get the cached content holding a preamble, registering it on first use.
+        
+        The handle is shared by every analyzer in the process, so a multi-site
+        run registers the preamble once. Returns None if registration failed.
+        """
+        key = (self.model_name, hashlib.sha256(preamble.encode('utf-8')).hexdigest())
+        # Holding the lock while registering makes concurrent sites wait for one upload
+        with _context_caches_lock:
+            if key not in _context_caches:
+                try:
+                    cached_content = call_with_retry(
+                        'gemini',
+                        self.client.caches.create,
+                        model=self.model_name,
+                        config=types.CreateCachedContentConfig(
+                            system_instruction=preamble,
+                            display_name='website-data-analyst-preamble',
+                            ttl=f'{GEMINI_CONTEXT_CACHE_TTL}s',
+                        )
+                    )
+                    _context_caches[key] = cached_content.name
+                    print(f"🧠 Registered the prompt preamble as Gemini cached content {cached_content.name}")
+                except genai_errors.APIError as e:
+                    _context_caches[key] = None
+                    print(f"⚠️  Gemini context caching unavailable, sending full prompts: {e}")
+            return _context_caches[key]
+    
+    def _drop_context_cache(self, name: str):
+        """Forget an expired or deleted cached content handle."""
+        with _context_caches_lock:
+            for key, value in list(_context_caches.items()):
+                if value == name:
+                    del _context_caches[key]
     
     def _get_default_prompt_template(self) -> str:
         """Get the default analysis prompt template."""
@@ -111,38 +222,205 @@ class GeminiAnalyzer:
 请基于以上数据生成详尽的分析报告。确保所有结论都有数据支撑，不要假设或编造任何未提供的信息。
 """
     
-    def analyze(self, ga4_data: dict, gsc_data: dict) -> str:
+    def _count_tokens(self, text: str) -> int:
+        """Count prompt tokens with Gemini count_tokens."""
+        return call_with_retry(
+            'gemini', self.client.models.count_tokens, model=self.model_name, contents=text
+        ).total_tokens
+    
+    def _format_data_within_budget(self, ga4_data: dict, gsc_data: dict) -> str:
+        """
+        Format the data tables, shortened so the full prompt fits PROMPT_TOKEN_BUDGET.
+        
+        Row counts are planned with the local estimator. With PROMPT_TOKEN_COUNTER
+        set to 'api', the planned prompt is counted once by Gemini and, if it is
+        still over budget, planned again with the estimator scaled to match.
+        """
+        prompt_template = self._load_prompt_template()
+        
+        def render_tables(ga4, gsc):
+            return prompt_template.format(data=self._format_data_as_tables(ga4, gsc))
+        
+        scale = 1.0
+        for _ in range(3):
+            ga4, gsc, limits, tokens = fit_to_budget(
+                ga4_data, gsc_data, render_tables, PROMPT_TOKEN_BUDGET,
+                count_tokens=lambda text: estimate_tokens(text) * scale
+            )
+            if PROMPT_TOKEN_COUNTER != 'api':
+                break
+            prompt = render_tables(ga4, gsc)
+            tokens = self._count_tokens(prompt)
+            if tokens <= PROMPT_TOKEN_BUDGET:
+                break
+            scale = tokens / max(1, estimate_tokens(prompt))
+        
+        shortened = {table: limit for table, limit in limits.items() if limit < TABLES[table]['limit']}
+        if shortened:
+            print(f"✂️  Prompt compacted to ~{tokens:.0f} tokens (budget {PROMPT_TOKEN_BUDGET}): " +
+                  ', '.join(f"{section} {limit} rows" for (_, section, _), limit in shortened.items()))
+        return self._format_data_as_tables(ga4, gsc)
+    
+    def build_prompt(self, ga4_data: dict, gsc_data: dict) -> str:
+        """Build the full analysis prompt for the combined GA4 and Search Console data."""
+        # Format data as structured tables with unique IDs, within the token budget
+        formatted_data = self._format_data_within_budget(ga4_data, gsc_data)
+        
+        # Load and format prompt
+        prompt_template = self._load_prompt_template()
+        return prompt_template.format(data=formatted_data)
+    
+    def analyze(self, ga4_data: dict, gsc_data: dict, prompt: str = None) -> str:
         """
         Analyze the combined GA4 and Search Console data.
         
         Args:
             ga4_data: Dictionary containing GA4 data
             gsc_data: Dictionary containing Search Console data
+            prompt: Prompt from build_prompt(), e.g. restored from a checkpoint
+                (default: built from the data)
             
         Returns:
             Markdown formatted analysis report
         """
         print("🤖 Generating AI analysis with Gemini...")
         
-        # Format data as structured tables with unique IDs
-        formatted_data = self._format_data_as_tables(ga4_data, gsc_data)
+        full_prompt = prompt or self.build_prompt(ga4_data, gsc_data)
+        analysis = self._generate(full_prompt)
         
-        # Load and format prompt
-        prompt_template = self._load_prompt_template()
-        full_prompt = prompt_template.format(data=formatted_data)
-        
-        # Generate analysis using new API
-        response = self.client.models.generate_content(
-            model=self.model_name,
-            contents=full_prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.2,  # Lower temperature for more factual output
-                top_p=0.8,
-                max_output_tokens=8000,
+        # Add data verification footer
+        analysis += self._generate_verification_footer(ga4_data, gsc_data)
+        
+        print("✅ Analysis generated successfully!")
+        return analysis
+    
+    def analyze_stream(self, ga4_data: dict, gsc_data: dict, prompt: str = None) -> Iterator[str]:
+        """
+        Analyze the combined data, yielding markdown chunks as Gemini generates them.
+        
+        The chunks joined together equal what analyze() returns, including the
+        data verification footer, which is yielded last.
+        
+        Args:
+            ga4_data: Dictionary containing GA4 data
+            gsc_data: Dictionary containing Search Console data
+            prompt: Prompt from build_prompt() (default: built from the data)
+        """
+        print("🤖 Generating AI analysis with Gemini (streaming)...")
+        
+        full_prompt = prompt or self.build_prompt(ga4_data, gsc_data)
+        yield from self._generate_stream(full_prompt)
+        
+        # Add data verification footer
+        yield self._generate_verification_footer(ga4_data, gsc_data)
+    
+    def _split_data_blocks(self, formatted_data: str) -> tuple[str, dict]:
+        """
+        Split formatted data into its shared header and marked blocks.
+        
+        Returns:
+            Tuple of (text before the first block, block name -> block text with markers)
+        """
+        blocks = {
+            match.group(1): match.group(0)
+            for match in re.finditer(r'<!-- (\S+)-START -->.*?<!-- \1-END -->', formatted_data, re.DOTALL)
+        }
+        header = formatted_data.split('<!-- ', 1)[0]
+        return header, blocks
+    
+    def _split_framework(self, template: str) -> Optional[tuple[str, list, str]]:
+        """
+        Split a prompt template around its analysis framework.
+        
+        Returns:
+            Tuple of (text before the framework, [(section heading, section text)],
+            text after the framework), or None if the template has no framework
+        """
+        start = template.find(FRAMEWORK_HEADING)
+        if start < 0:
+            return None
+        # The framework runs until the next divider or level-2 heading
+        end = re.search(r'\n(?:---|## )', template[start + len(FRAMEWORK_HEADING):])
+        end = start + len(FRAMEWORK_HEADING) + end.start() if end else len(template)
+        
+        parts = re.split(r'\n(?=### )', template[start:end])
+        sections = [(part.split('\n', 1)[0][4:].strip(), part.strip()) for part in parts[1:]]
+        if not sections:
+            return None
+        return template[:start], sections, template[end:]
+    
+    def build_section_prompts(self, ga4_data: dict, gsc_data: dict) -> Optional[list[tuple[str, str]]]:
+        """
+        Build one focused prompt per report section.
+        
+        Each prompt keeps the template's rules, asks for a single section of
+        the analysis framework and carries only the data blocks that section
+        needs (see SECTION_DATA_BLOCKS).
+        
+        Returns:
+            List of (section heading, prompt) in report order, or None if the
+            template has no analysis framework to split
+        """
+        template = self._load_prompt_template()
+        framework = self._split_framework(template.text)
+        if framework is None:
+            return None
+        before, sections, after = framework
+        header, blocks = self._split_data_blocks(self._format_data_within_budget(ga4_data, gsc_data))
+        
+        prompts = []
+        for heading, text in sections:
+            names = next((names for keyword, names in SECTION_DATA_BLOCKS.items() if keyword in heading), blocks)
+            data = header + '\n'.join(blocks[name] for name in names if name in blocks)
+            task = (
+                f"{FRAMEWORK_HEADING}\n\n"
+                "本次只撰写报告中的以下一个章节，从该章节标题开始输出，不要输出其他章节或报告标题：\n\n"
+                f"{text}\n"
             )
+            section_template = parse_prompt_template(before + task + after, source=f"{template.source} ({heading})")
+            prompts.append((heading, section_template.format(data=data)))
+        return prompts
+    
+    def analyze_sections(self, ga4_data: dict, gsc_data: dict, max_workers: int = None, slot=None) -> str:
+        """
+        Analyze the data with one concurrent generation per report section.
+        
+        Sections are assembled in template order, so wall time approaches the
+        slowest section instead of one long generation. Templates without an
+        analysis framework fall back to analyze().
+        
+        Args:
+            ga4_data: Dictionary containing GA4 data
+            gsc_data: Dictionary containing Search Console data
+            max_workers: Sections generated at once (default: SECTION_CONCURRENCY)
+            slot: Context manager held around each section's Gemini call, such as
+                a semaphore shared with other sites' runs
+            
+        Returns:
+            Markdown formatted analysis report
+        """
+        slot = slot or nullcontext()
+        prompts = self.build_section_prompts(ga4_data, gsc_data)
+        if prompts is None:
+            with slot:
+                return self.analyze(ga4_data, gsc_data)
+        
+        print(f"🤖 Generating {len(prompts)} report sections concurrently with Gemini...")
+        
+        def generate(prompt):
+            with slot:
+                return self._generate(prompt)
+        
+        texts = run_all_or_raise(
+            {heading: lambda prompt=prompt: generate(prompt) for heading, prompt in prompts},
+            max_workers or SECTION_CONCURRENCY
         )
         
-        analysis = response.text
+        # Keep the template's report title above the sections
+        title = self._load_prompt_template().text.split('\n', 1)[0]
+        parts = [title] if title.startswith('# ') else []
+        parts.extend(texts[heading].strip() for heading, _ in prompts)
+        analysis = '\n\n'.join(parts)
         
         # Add data verification footer
         analysis += self._generate_verification_footer(ga4_data, gsc_data)
@@ -150,6 +428,91 @@ class GeminiAnalyzer:
         print("✅ Analysis generated successfully!")
         return analysis
     
+    def _response_cache_key(self, prompt: str) -> str:
+        """Key a generation by model, generation settings and prompt hash."""
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return fingerprint(self.model_name, GENERATION_CONFIG, prompt_hash)
+    
+    def _cached_generation(self, prompt: str) -> Optional[str]:
+        """Get the text generated earlier for an identical prompt, if cached."""
+        if self.response_cache is None:
+            return None
+        cached = self.response_cache.get(self._response_cache_key(prompt))
+        if cached is not None:
+            print("⚡ Identical prompt found in the Gemini response cache, skipping generation")
+        return cached
+    
+    def _store_generation(self, prompt: str, text: str):
+        """Cache generated text; empty or blocked responses are skipped so the next run tries again."""
+        if text and self.response_cache is not None:
+            self.response_cache.set(self._response_cache_key(prompt), text)
+    
+    def _generation_request(self, prompt: str) -> dict:
+        """
+        Build generation arguments for a prompt.
+        
+        With context caching, only the part of the prompt after the registered
+        preamble is sent and the preamble is referenced by its handle.
+        """
+        contents = prompt
+        config = dict(GENERATION_CONFIG)
+        
+        if self.use_context_cache:
+            preamble = self._static_preamble()
+            if preamble.strip() and prompt.startswith(preamble):
+                name = self._context_cache_name(preamble)
+                if name is not None:
+                    contents = prompt[len(preamble):]
+                    config['cached_content'] = name
+        
+        return {
+            'model': self.model_name,
+            'contents': contents,
+            'config': types.GenerateContentConfig(**config),
+        }
+    
+    def _call_generation(self, method, prompt: str):
+        """Call a generation method, retrying transient failures and expired preamble handles."""
+        request = self._generation_request(prompt)
+        try:
+            # 429/503 responses are retried with backoff
+            return call_with_retry('gemini', method, **request)
+        except genai_errors.ClientError as e:
+            # The cached content expired or was deleted; register it again and resend
+            name = request['config'].cached_content
+            if not name or e.code not in (403, 404):
+                raise
+            self._drop_context_cache(name)
+            return call_with_retry('gemini', method, **self._generation_request(prompt))
+    
+    def _generate(self, prompt: str) -> str:
+        """Generate text for a prompt, serving identical prompts from the response cache."""
+        text = self._cached_generation(prompt)
+        if text is None:
+            text = self._call_generation(self.client.models.generate_content, prompt).text
+            self._store_generation(prompt, text)
+        return text
+    
+    def _open_stream(self, **request) -> tuple:
+        """Start a streaming generation and wait for its first chunk, so failures surface here."""
+        stream = self.client.models.generate_content_stream(**request)
+        return next(stream, None), stream
+    
+    def _generate_stream(self, prompt: str) -> Iterator[str]:
+        """Yield text chunks for a prompt as they are generated."""
+        text = self._cached_generation(prompt)
+        if text is not None:
+            yield text
+            return
+        
+        first, stream = self._call_generation(self._open_stream, prompt)
+        parts = []
+        for chunk in itertools.chain([first] if first is not None else [], stream):
+            if chunk.text:
+                parts.append(chunk.text)
+                yield chunk.text
+        self._store_generation(prompt, ''.join(parts))
+    
     def _format_data_as_tables(self, ga4_data: dict, gsc_data: dict) -> str:
         """
         Format data as structured Markdown tables with unique IDs.
@@ -159,318 +522,17 @@ class GeminiAnalyzer:
         2. Adding unique IDs to each data record
         3. Using boundary markers for data sections
         """
-        output = []
-        
-        # Display analysis period prominently
-        ga4_period = ga4_data.get('overview', {}).get('period', {}).get('current', {})
-        if ga4_period:
-            output.append(f"## 📅 分析时间段\n")
-            output.append(f"**当前周期**: {ga4_period.get('start', 'N/A')} 至 {ga4_period.get('end', 'N/A')}")
-            prev_period = ga4_data.get('overview', {}).get('period', {}).get('previous', {})
-            if prev_period:
-                output.append(f"**对比周期**: {prev_period.get('start', 'N/A')} 至 {prev_period.get('end', 'N/A')}")
-            output.append("")
-        
-        output.append(f"报告生成时间: {datetime.now().isoformat()}\n")
-        
-        # GA4 Overview Section
-        output.append("<!-- GA4-OVERVIEW-START -->")
-        output.append("## GA4 数据总览\n")
-        if 'overview' in ga4_data:
-            overview = ga4_data['overview']
-            if 'current' in overview and 'previous' in overview:
-                output.append("| 指标 | 本周 | 上周 | 变化 | 数据ID |")
-                output.append("|------|------|------|------|--------|")
-                current = overview.get('current', {})
-                previous = overview.get('previous', {})
-                changes = overview.get('changes', {})
-                
-                metrics = [
-                    ('activeUsers', '活跃用户', 'GA4-OV01', False),
-                    ('newUsers', '新用户', 'GA4-OV02', False),
-                    ('sessions', '会话数', 'GA4-OV03', False),
-                    ('bounceRate', '跳出率(%)', 'GA4-OV04', True),  # needs percentage conversion
-                    ('engagementRate', '互动率(%)', 'GA4-OV05', True),  # needs percentage conversion
-                    ('screenPageViews', '页面浏览', 'GA4-OV06', False),
-                    ('averageSessionDuration', '平均会话时长(秒)', 'GA4-OV07', False),
-                ]
-                for key, label, data_id, is_rate in metrics:
-                    curr_val = current.get(key, 'N/A')
-                    prev_val = previous.get(key, 'N/A')
-                    change = changes.get(key, 'N/A')
-                    # Convert rates from decimal to percentage
-                    if is_rate and isinstance(curr_val, (int, float)):
-                        curr_val = round(curr_val * 100, 2)
-                    if is_rate and isinstance(prev_val, (int, float)):
-                        prev_val = round(prev_val * 100, 2)
-                    output.append(f"| {label} | {curr_val} | {prev_val} | {change}% | {data_id} |")
-        output.append("<!-- GA4-OVERVIEW-END -->\n")
-        
-        # GA4 Traffic Sources
-        output.append("<!-- GA4-SOURCES-START -->")
-        output.append("## GA4 流量来源\n")
-        if 'traffic_sources' in ga4_data:
-            sources = ga4_data['traffic_sources'].get('sources', [])
-            if sources:
-                output.append("| ID | 来源/媒介 | 用户数 | 会话数 | 跳出率(%) |")
-                output.append("|-----|-----------|--------|--------|-----------|")
-                for i, source in enumerate(sources[:15], 1):
-                    src_id = f"SRC{i:03d}"
-                    name = source.get('source', 'N/A')
-                    users = source.get('users', 'N/A')
-                    sessions = source.get('sessions', 'N/A')
-                    bounce_raw = source.get('bounceRate', 0)
-                    bounce = round(bounce_raw * 100, 2) if isinstance(bounce_raw, (int, float)) else 'N/A'
-                    output.append(f"| {src_id} | {name} | {users} | {sessions} | {bounce} |")
-        output.append("<!-- GA4-SOURCES-END -->\n")
-        
-        # GA4 Top Pages
-        output.append("<!-- GA4-PAGES-START -->")
-        output.append("## GA4 热门页面\n")
-        if 'top_pages' in ga4_data:
-            pages = ga4_data['top_pages'].get('pages', [])
-            if pages:
-                output.append("| ID | 页面路径 | 浏览量 | 跳出率(%) | 平均停留时长 |")
-                output.append("|-----|----------|--------|-----------|--------------|")
-                for i, page in enumerate(pages[:15], 1):
-                    page_id = f"PAGE{i:03d}"
-                    path = page.get('pagePath', 'N/A')[:50]
-                    views = page.get('pageViews', 'N/A')
-                    bounce_raw = page.get('bounceRate', 0)
-                    bounce = round(bounce_raw * 100, 2) if isinstance(bounce_raw, (int, float)) else 'N/A'
-                    duration_sec = page.get('avgEngagementTime', 0)
-                    # Format duration as mm:ss for readability
-                    if isinstance(duration_sec, (int, float)):
-                        mins = int(duration_sec // 60)
-                        secs = int(duration_sec % 60)
-                        duration = f"{mins}:{secs:02d}"
-                    else:
-                        duration = 'N/A'
-                    output.append(f"| {page_id} | {path} | {views} | {bounce} | {duration} |")
-        output.append("<!-- GA4-PAGES-END -->\n")
-        
-        # GA4 Device Breakdown
-        output.append("<!-- GA4-DEVICES-START -->")
-        output.append("## GA4 设备分布\n")
-        if 'devices' in ga4_data:
-            devices = ga4_data['devices'].get('devices', [])
-            if devices:
-                output.append("| ID | 设备类型 | 用户数 | 会话数 | 占比(%) | 跳出率(%) |")
-                output.append("|-----|----------|--------|--------|--------|-----------|")
-                for i, device in enumerate(devices, 1):
-                    dev_id = f"DEV{i:03d}"
-                    category = device.get('device', 'N/A')
-                    users = device.get('users', 'N/A')
-                    sessions = device.get('sessions', 'N/A')
-                    pct = device.get('percentage', 'N/A')
-                    bounce_raw = device.get('bounceRate', 0)
-                    bounce = round(bounce_raw * 100, 2) if isinstance(bounce_raw, (int, float)) else 'N/A'
-                    output.append(f"| {dev_id} | {category} | {users} | {sessions} | {pct} | {bounce} |")
-        output.append("<!-- GA4-DEVICES-END -->\n")
-        
-        # GA4 Geo Breakdown
-        output.append("<!-- GA4-GEO-START -->")
-        output.append("## GA4 地区分布\n")
-        if 'geo' in ga4_data:
-            countries = ga4_data['geo'].get('countries', [])
-            if countries:
-                output.append("| ID | 国家/地区 | 用户数 | 会话数 | 占比(%) |")
-                output.append("|-----|-----------|--------|--------|--------|")
-                for i, country in enumerate(countries[:10], 1):
-                    geo_id = f"GEO{i:03d}"
-                    name = country.get('country', 'N/A')
-                    users = country.get('users', 'N/A')
-                    sessions = country.get('sessions', 'N/A')
-                    pct = country.get('percentage', 'N/A')
-                    output.append(f"| {geo_id} | {name} | {users} | {sessions} | {pct} |")
-        output.append("<!-- GA4-GEO-END -->\n")
-        
-        # Search Console Overview
-        output.append("<!-- GSC-OVERVIEW-START -->")
-        output.append("## Search Console 数据总览\n")
-        if 'overview' in gsc_data:
-            overview = gsc_data['overview']
-            if 'current' in overview and 'previous' in overview:
-                output.append("| 指标 | 本周 | 上周 | 变化 | 数据ID |")
-                output.append("|------|------|------|------|--------|")
-                current = overview.get('current', {})
-                previous = overview.get('previous', {})
-                changes = overview.get('changes', {})
-                
-                metrics = [
-                    ('clicks', '点击数', 'GSC-OV01'),
-                    ('impressions', '展示数', 'GSC-OV02'),
-                    ('ctr', 'CTR(%)', 'GSC-OV03'),
-                    ('position', '平均排名', 'GSC-OV04'),
-                ]
-                for key, label, data_id in metrics:
-                    curr_val = current.get(key, 'N/A')
-                    prev_val = previous.get(key, 'N/A')
-                    change = changes.get(key, 'N/A')
-                    output.append(f"| {label} | {curr_val} | {prev_val} | {change}% | {data_id} |")
-        output.append("<!-- GSC-OVERVIEW-END -->\n")
-        
-        # Search Console Top Queries
-        output.append("<!-- GSC-QUERIES-START -->")
-        output.append("## Search Console 关键词\n")
-        if 'top_queries' in gsc_data:
-            queries = gsc_data['top_queries'].get('queries', [])
-            if queries:
-                output.append("| ID | 关键词 | 点击 | 展示 | CTR(%) | 平均排名 |")
-                output.append("|-----|--------|------|------|--------|----------|")
-                for i, query in enumerate(queries[:20], 1):
-                    kw_id = f"KW{i:03d}"
-                    keyword = query.get('query', 'N/A')[:40]
-                    clicks = query.get('clicks', 'N/A')
-                    impressions = query.get('impressions', 'N/A')
-                    ctr = query.get('ctr', 'N/A')
-                    position = query.get('position', 'N/A')
-                    output.append(f"| {kw_id} | {keyword} | {clicks} | {impressions} | {ctr} | {position} |")
-        output.append("<!-- GSC-QUERIES-END -->\n")
-        
-        # Search Console Top Pages
-        output.append("<!-- GSC-PAGES-START -->")
-        output.append("## Search Console 页面表现\n")
-        if 'top_pages' in gsc_data:
-            pages = gsc_data['top_pages'].get('pages', [])
-            if pages:
-                output.append("| ID | 页面URL | 点击 | 展示 | CTR(%) | 平均排名 |")
-                output.append("|-----|---------|------|------|--------|----------|")
-                for i, page in enumerate(pages[:15], 1):
-                    page_id = f"GSCPG{i:03d}"
-                    url = page.get('page', 'N/A')[:50]
-                    clicks = page.get('clicks', 'N/A')
-                    impressions = page.get('impressions', 'N/A')
-                    ctr = page.get('ctr', 'N/A')
-                    position = page.get('position', 'N/A')
-                    output.append(f"| {page_id} | {url} | {clicks} | {impressions} | {ctr} | {position} |")
-        output.append("<!-- GSC-PAGES-END -->\n")
-        
-        # GSC Device Breakdown
-        output.append("<!-- GSC-DEVICES-START -->")
-        output.append("## Search Console 设备分布\n")
-        if 'devices' in gsc_data:
-            devices = gsc_data['devices'].get('devices', [])
-            if devices:
-                output.append("| ID | 设备类型 | 点击 | 展示 | CTR(%) | 占比(%) |")
-                output.append("|-----|----------|------|------|--------|--------|")
-                for i, device in enumerate(devices, 1):
-                    dev_id = f"GSCDEV{i:03d}"
-                    category = device.get('device', 'N/A')
-                    clicks = device.get('clicks', 'N/A')
-                    impressions = device.get('impressions', 'N/A')
-                    ctr = device.get('ctr', 'N/A')
-                    pct = device.get('percentage', 'N/A')
-                    output.append(f"| {dev_id} | {category} | {clicks} | {impressions} | {ctr} | {pct} |")
-        output.append("<!-- GSC-DEVICES-END -->\n")
-        
-        # GSC Country Breakdown
-        output.append("<!-- GSC-COUNTRIES-START -->")
-        output.append("## Search Console 国家分布\n")
-        if 'countries' in gsc_data:
-            countries = gsc_data['countries'].get('countries', [])
-            if countries:
-                output.append("| ID | 国家 | 点击 | 展示 | CTR(%) | 占比(%) |")
-                output.append("|-----|------|------|------|--------|--------|")
-                for i, country in enumerate(countries[:10], 1):
-                    country_id = f"GSCC{i:03d}"
-                    name = country.get('country', 'N/A')
-                    clicks = country.get('clicks', 'N/A')
-                    impressions = country.get('impressions', 'N/A')
-                    ctr = country.get('ctr', 'N/A')
-                    pct = country.get('percentage', 'N/A')
-                    output.append(f"| {country_id} | {name} | {clicks} | {impressions} | {ctr} | {pct} |")
-        output.append("<!-- GSC-COUNTRIES-END -->\n")
-        
-        # CTR Opportunities
-        output.append("<!-- GSC-OPPORTUNITIES-START -->")
-        output.append("## CTR 优化机会（高展示低CTR）\n")
-        if 'opportunities' in gsc_data:
-            opps = gsc_data['opportunities'].get('opportunities', [])
-            if opps:
-                output.append("| ID | 关键词 | 点击 | 展示 | CTR(%) | 排名 | 优化潜力 |")
-                output.append("|-----|--------|------|------|--------|------|----------|")
-                for i, opp in enumerate(opps[:10], 1):
-                    opp_id = f"OPP{i:03d}"
-                    keyword = opp.get('query', 'N/A')[:40]
-                    clicks = opp.get('clicks', 'N/A')
-                    impressions = opp.get('impressions', 'N/A')
-                    ctr = opp.get('ctr', 'N/A')
-                    position = opp.get('position', 'N/A')
-                    potential = opp.get('potentialClicks', 'N/A')
-                    output.append(f"| {opp_id} | {keyword} | {clicks} | {impressions} | {ctr} | {position} | +{potential} |")
-        output.append("<!-- GSC-OPPORTUNITIES-END -->\n")
-        
-        return "\n".join(output)
+        # Date only, so reruns on the same day build a byte-identical, cacheable prompt
+        return render(
+            DATA_TABLES_TEMPLATE,
+            ga4_data=ga4_data,
+            gsc_data=gsc_data,
+            report_date=datetime.now().strftime('%Y-%m-%d'),
+        )
     
     def _generate_verification_footer(self, ga4_data: dict, gsc_data: dict) -> str:
         """Generate a verification footer with key data points for reference."""
-        footer = "\n\n---\n\n## 数据来源验证\n\n"
-        footer += "> 以下为原始数据摘要，供人工核对分析结论准确性\n\n"
-        
-        # GA4 Overview Comparison
-        footer += "### GA4 核心指标\n\n"
-        footer += "| 数据ID | 指标 | 当前周期 | 对比周期 | 变化 |\n"
-        footer += "|--------|------|----------|----------|------|\n"
-        
-        if 'overview' in ga4_data:
-            overview = ga4_data['overview']
-            current = overview.get('current', {})
-            previous = overview.get('previous', {})
-            changes = overview.get('changes', {})
-            
-            metrics = [
-                ('activeUsers', '活跃用户', 'GA4-OV01', False),
-                ('sessions', '会话数', 'GA4-OV02', False),
-                ('bounceRate', '跳出率(%)', 'GA4-OV03', True),
-            ]
-            for key, label, data_id, is_rate in metrics:
-                curr = current.get(key, 'N/A')
-                prev = previous.get(key, 'N/A')
-                change = changes.get(key, 'N/A')
-                # Convert bounce rate to percentage
-                if is_rate and isinstance(curr, (int, float)):
-                    curr = f"{round(curr * 100, 2)}%"
-                if is_rate and isinstance(prev, (int, float)):
-                    prev = f"{round(prev * 100, 2)}%"
-                footer += f"| {data_id} | {label} | {curr} | {prev} | {change}% |\n"
-        
-        # GSC Overview Comparison
-        footer += "\n### Search Console 核心指标\n\n"
-        footer += "| 数据ID | 指标 | 当前周期 | 对比周期 | 变化 |\n"
-        footer += "|--------|------|----------|----------|------|\n"
-        
-        if 'overview' in gsc_data:
-            overview = gsc_data['overview']
-            current = overview.get('current', {})
-            previous = overview.get('previous', {})
-            changes = overview.get('changes', {})
-            
-            metrics = [
-                ('clicks', '点击数', 'GSC-OV01'),
-                ('impressions', '展示数', 'GSC-OV02'),
-                ('ctr', 'CTR(%)', 'GSC-OV03'),
-                ('position', '平均排名', 'GSC-OV04'),
-            ]
-            for key, label, data_id in metrics:
-                curr = current.get(key, 'N/A')
-                prev = previous.get(key, 'N/A')
-                change = changes.get(key, 'N/A')
-                footer += f"| {data_id} | {label} | {curr} | {prev} | {change}% |\n"
-        
-        # Top 5 Keywords Quick Reference
-        footer += "\n### TOP 5 关键词速查\n\n"
-        if 'top_queries' in gsc_data:
-            queries = gsc_data['top_queries'].get('queries', [])[:5]
-            if queries:
-                footer += "| ID | 关键词 | 点击 | 展示 |\n"
-                footer += "|----|--------|------|------|\n"
-                for i, q in enumerate(queries, 1):
-                    footer += f"| KW{i:03d} | {q.get('query', 'N/A')[:30]} | {q.get('clicks', 'N/A')} | {q.get('impressions', 'N/A')} |\n"
-        
-        footer += f"\n*数据获取时间: {ga4_data.get('fetched_at', 'N/A')}*\n"
-        
-        return footer
+        return render(VERIFICATION_FOOTER_TEMPLATE, ga4_data=ga4_data, gsc_data=gsc_data)
 
 
 def test_connection() -> bool:
@@ -0,0 +1,175 @@
+"""
+Prompt Budget Module.
+Compacts report data tables so the analysis prompt fits a token budget.
+"""
+
+import math
+import re
+from typing import Callable
+
+# Data tables shown in the prompt: (source, section key, list key) -> how to compact them.
+#   limit: rows shown when the prompt fits the budget
+#   label: field naming a row; the collapsed tail row is labelled in it
+#   sums: fields added up for the tail row
+#   weighted: rate field -> field its tail average is weighted by
+#   url: field holding URLs or paths whose shared prefix is abbreviated
+#   collapse: False for tables whose rows are individual action items
+TABLES = {
+    ('ga4', 'traffic_sources', 'sources'): {
+        'limit': 15, 'label': 'source', 'sums': ('users', 'sessions'),
+        'weighted': {'bounceRate': 'sessions'},
+    },
+    ('ga4', 'top_pages', 'pages'): {
+        'limit': 15, 'label': 'pagePath', 'sums': ('pageViews',),
+        'weighted': {'bounceRate': 'pageViews', 'avgEngagementTime': 'pageViews'}, 'url': 'pagePath',
+    },
+    ('ga4', 'devices', 'devices'): {
+        'limit': 10, 'label': 'device', 'sums': ('users', 'sessions', 'percentage'),
+        'weighted': {'bounceRate': 'sessions', 'avgSessionDuration': 'sessions'},
+    },
+    ('ga4', 'geo', 'countries'): {
+        'limit': 10, 'label': 'country', 'sums': ('users', 'sessions', 'percentage'),
+    },
+    ('gsc', 'top_queries', 'queries'): {
+        'limit': 20, 'label': 'query', 'sums': ('clicks', 'impressions'),
+        'weighted': {'ctr': 'impressions', 'position': 'impressions'},
+    },
+    ('gsc', 'top_pages', 'pages'): {
+        'limit': 15, 'label': 'page', 'sums': ('clicks', 'impressions'),
+        'weighted': {'ctr': 'impressions', 'position': 'impressions'}, 'url': 'page',
+    },
+    ('gsc', 'devices', 'devices'): {
+        'limit': 10, 'label': 'device', 'sums': ('clicks', 'impressions', 'percentage'),
+        'weighted': {'ctr': 'impressions'},
+    },
+    ('gsc', 'countries', 'countries'): {
+        'limit': 10, 'label': 'country', 'sums': ('clicks', 'impressions', 'percentage'),
+        'weighted': {'ctr': 'impressions'},
+    },
+    ('gsc', 'opportunities', 'opportunities'): {
+        'limit': 10, 'label': 'query', 'collapse': False,
+    },
+}
+
+# Rows every table keeps however tight the budget is
+MIN_TABLE_ROWS = 3
+
+# Shortest shared URL prefix worth abbreviating
+MIN_URL_PREFIX_LENGTH = 12
+
+_CJK = re.compile(r'[\u3000-\u303f\u3400-\u9fff\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate tokens locally: about one per CJK character and one per four other characters."""
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def collapse_tail(rows: list, limit: int, spec: dict) -> list:
+    """Keep the first limit - 1 rows and merge the rest into one aggregate row."""
+    if len(rows) <= limit:
+        return rows
+    if not spec.get('collapse', True):
+        return rows[:limit]
+
+    head, tail = rows[:limit - 1], rows[limit - 1:]
+    other = {spec['label']: f'其他（{len(tail)} 项合计）'}
+    for field in spec.get('sums', ()):
+        values = [row[field] for row in tail if isinstance(row.get(field), (int, float))]
+        other[field] = round(sum(values), 2)
+    for field, weight_field in spec.get('weighted', {}).items():
+        pairs = [(row[field], row.get(weight_field, 0)) for row in tail
+                 if isinstance(row.get(field), (int, float)) and isinstance(row.get(weight_field), (int, float))]
+        total_weight = sum(weight for _, weight in pairs)
+        other[field] = round(sum(value * weight for value, weight in pairs) / total_weight, 4) if total_weight else 0
+    return head + [other]
+
+
+def abbreviate_urls(rows: list, field: str) -> tuple[list, str]:
+    """
+    Strip the URL prefix shared by every row, up to its last '/'.
+
+    Returns:
+        Tuple of (rows with shortened URLs, removed prefix or '' if none)
+    """
+    urls = [row[field] for row in rows if isinstance(row.get(field), str)]
+    if len(urls) < 2:
+        return rows, ''
+
+    common = urls[0]
+    for url in urls[1:]:
+        while not url.startswith(common):
+            common = common[:-1]
+    prefix = common[:common.rfind('/')] if '/' in common else ''
+    if len(prefix) < MIN_URL_PREFIX_LENGTH:
+        return rows, ''
+
+    return [
+        {**row, field: row[field][len(prefix):]} if isinstance(row.get(field), str) else row
+        for row in rows
+    ], prefix
+
+
+def compact_data(ga4_data: dict, gsc_data: dict, limits: dict) -> tuple[dict, dict]:
+    """
+    Copy the report data with every table cut to its row limit.
+
+    Long tails are merged into one "other" row and shared URL prefixes are
+    abbreviated; the removed prefix is kept as the section's 'url_prefix'.
+    """
+    data = {'ga4': dict(ga4_data), 'gsc': dict(gsc_data)}
+    for (source, section, key), spec in TABLES.items():
+        table = data[source].get(section)
+        if not isinstance(table, dict) or not table.get(key):
+            continue
+        table = dict(table)
+        rows = table[key]
+        if spec.get('url'):
+            rows, prefix = abbreviate_urls(rows, spec['url'])
+            if prefix:
+                table['url_prefix'] = prefix
+        table[key] = collapse_tail(rows, limits[(source, section, key)], spec)
+        data[source][section] = table
+    return data['ga4'], data['gsc']
+
+
+def _table_rows(ga4_data: dict, gsc_data: dict, table: tuple) -> int:
+    source, section, key = table
+    data = ga4_data if source == 'ga4' else gsc_data
+    return len((data.get(section) or {}).get(key) or [])
+
+
+def fit_to_budget(ga4_data: dict, gsc_data: dict, render: Callable[[dict, dict], str], budget: int,
+                  count_tokens: Callable[[str], int] = estimate_tokens) -> tuple[dict, dict, dict, int]:
+    """
+    Shrink the data tables until the rendered prompt fits the token budget.
+
+    The table currently showing the most rows is cut by a quarter at a time,
+    down to MIN_TABLE_ROWS each.
+
+    Args:
+        ga4_data: GA4 data as fetched
+        gsc_data: Search Console data as fetched
+        render: Builds the prompt from compacted GA4 and Search Console data
+        budget: Maximum prompt tokens
+        count_tokens: Token counter applied to rendered prompts
+
+    Returns:
+        Tuple of (compacted GA4 data, compacted Search Console data,
+        table -> row limit, prompt tokens)
+    """
+    limits = {table: spec['limit'] for table, spec in TABLES.items()}
+    while True:
+        ga4, gsc = compact_data(ga4_data, gsc_data, limits)
+        tokens = count_tokens(render(ga4, gsc))
+        if tokens <= budget:
+            return ga4, gsc, limits, tokens
+
+        shown = {table: min(limit, _table_rows(ga4_data, gsc_data, table)) for table, limit in limits.items()}
+        shrinkable = [table for table, rows in shown.items() if rows > MIN_TABLE_ROWS]
+        if not shrinkable:
+            return ga4, gsc, limits, tokens
+
+        largest = max(shrinkable, key=lambda table: shown[table])
+        limits[largest] = max(MIN_TABLE_ROWS, shown[largest] * 3 // 4)
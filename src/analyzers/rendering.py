@@ -0,0 +1,174 @@
+"""
+Template Rendering Module.
+Renders report data tables and footers from Jinja2 templates compiled once per process,
+and loads the analysis prompt template once per file change.
+"""
+
+import functools
+import string
+import threading
+from pathlib import Path
+from typing import Optional
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined
+
+from src.config import PROJECT_ROOT
+
+TEMPLATES_DIR = PROJECT_ROOT / 'templates'
+
+# Templates compiled when first rendered and kept for the life of the process
+DATA_TABLES_TEMPLATE = 'data_tables.md.j2'
+VERIFICATION_FOOTER_TEMPLATE = 'verification_footer.md.j2'
+
+# Placeholders of the analysis prompt template
+PROMPT_FIELDS = ('data',)
+
+# str.format conversions: {value!r}, {value!s}, {value!a}
+_CONVERSIONS = {'r': repr, 's': str, 'a': ascii}
+
+_lock = threading.Lock()
+_environment = None
+
+# Prompt template path -> ((mtime, size, fields), parsed template)
+_prompt_templates = {}
+
+
+def percent(value, default=None):
+    """Convert a decimal rate to a percentage; non-numbers pass through (or become default)."""
+    if isinstance(value, (int, float)):
+        return round(value * 100, 2)
+    return value if default is None else default
+
+
+def duration(seconds) -> str:
+    """Format seconds as m:ss, or 'N/A' if not a number."""
+    if not isinstance(seconds, (int, float)):
+        return 'N/A'
+    return f"{int(seconds // 60)}:{int(seconds % 60):02d}"
+
+
+def get_environment() -> Environment:
+    """Get the process-wide Jinja2 environment, creating it on first use."""
+    global _environment
+    with _lock:
+        if _environment is None:
+            environment = Environment(
+                loader=FileSystemLoader(str(TEMPLATES_DIR)),
+                autoescape=False,  # Markdown for Gemini and Notion, not HTML
+                trim_blocks=True,
+                lstrip_blocks=True,
+                keep_trailing_newline=True,
+                undefined=StrictUndefined,
+                auto_reload=False,  # templates are compiled once per process
+            )
+            environment.filters['percent'] = percent
+            environment.filters['duration'] = duration
+            _environment = environment
+    return _environment
+
+
+def render(name: str, **context) -> str:
+    """Render a template from templates/ with the given context."""
+    return get_environment().get_template(name).render(**context)
+
+
+class TemplateError(ValueError):
+    """Raised when a prompt template's placeholders do not match the fields it is rendered with."""
+
+
+class PromptTemplate:
+    """
+    A str.format-style prompt template, parsed once.
+
+    Placeholders are checked when the template is loaded, so a typo such as
+    {date} fails with the template's path instead of a KeyError deep inside
+    the analysis.
+    """
+
+    def __init__(self, text: str, fields: tuple = PROMPT_FIELDS, source: str = '<default>'):
+        """
+        Parse and validate a template.
+
+        Args:
+            text: Template text; literal braces are written {{ and }}
+            fields: Placeholders the template must use, and the only ones it may use
+            source: Where the template came from, for error messages
+        """
+        self.text = text
+        self.source = source
+        try:
+            self._parts = list(string.Formatter().parse(text))
+        except ValueError as e:
+            raise TemplateError(f"Invalid prompt template {source}: {e}") from e
+
+        placeholders = {field for _, field, _, _ in self._parts if field is not None}
+        unknown = sorted(placeholders - set(fields))
+        missing = sorted(set(fields) - placeholders)
+        if unknown or missing:
+            problems = []
+            if unknown:
+                problems.append(f"unknown placeholders {', '.join('{' + f + '}' for f in unknown)} "
+                                "(escape literal braces as {{ and }})")
+            if missing:
+                problems.append(f"missing placeholders {', '.join('{' + f + '}' for f in missing)}")
+            raise TemplateError(f"Invalid prompt template {source}: {'; '.join(problems)}")
+
+    def format(self, **values) -> str:
+        """Fill in the placeholders from the pre-parsed template."""
+        output = []
+        for literal, field, format_spec, conversion in self._parts:
+            output.append(literal)
+            if field is not None:
+                value = values[field]
+                if conversion:
+                    value = _CONVERSIONS[conversion](value)
+                output.append(format(value, format_spec) if format_spec else str(value))
+        return ''.join(output)
+
+    def preamble(self, field: str = 'data') -> str:
+        """Get the fixed text before the first use of a placeholder."""
+        output = []
+        for literal, name, _, _ in self._parts:
+            output.append(literal)
+            if name == field:
+                break
+        return ''.join(output)
+
+
+@functools.lru_cache(maxsize=16)
+def parse_prompt_template(text: str, fields: tuple = PROMPT_FIELDS, source: str = '<default>') -> PromptTemplate:
+    """Parse a template held in code, once per distinct text."""
+    return PromptTemplate(text, fields, source)
+
+
+def load_prompt_template(path: Path, fields: tuple = PROMPT_FIELDS) -> Optional[PromptTemplate]:
+    """
+    Get a prompt template file, parsed and validated.
+
+    The parsed template is kept per process and reloaded only when the file's
+    modification time or size changes, so long-running processes pick up edits
+    without re-reading the file for every report.
+
+    Returns:
+        The template, or None if the file does not exist
+
+    Raises:
+        TemplateError: If the template's placeholders do not match fields
+    """
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        with _lock:
+            _prompt_templates.pop(path, None)
+        return None
+
+    version = (stat.st_mtime_ns, stat.st_size, fields)
+    with _lock:
+        cached = _prompt_templates.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    template = PromptTemplate(path.read_text(encoding='utf-8'), fields, str(path))
+    with _lock:
+        _prompt_templates[path] = (version, template)
+    return template
@@ -0,0 +1,122 @@
+"""
+Persistent Response Cache Module.
+Stores API responses on disk, keyed by a fingerprint of the request.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from src.config import CACHE_DIR, RESPONSE_CACHE_MAX_MB
+
+
+def fingerprint(*parts) -> str:
+    """Build a stable hash from JSON-serializable request parts."""
+    canonical = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def finality_ttl(end_date: str, final_after_days: int, fresh_ttl: float) -> Optional[float]:
+    """
+    Pick a TTL for data ending on end_date.
+    
+    Data more than final_after_days old no longer changes upstream and never
+    expires (None); more recent data is only kept for fresh_ttl seconds.
+    """
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    if end < datetime.now().date() - timedelta(days=final_after_days):
+        return None
+    return fresh_ttl
+
+
+class ResponseCache:
+    """Size-bounded on-disk key/value cache with per-entry TTLs."""
+    
+    def __init__(self, namespace: str, max_bytes: int = None, directory: Path = None):
+        """
+        Initialize the cache.
+        
+        Args:
+            namespace: Subdirectory under the cache directory (e.g. 'ga4', 'gsc')
+            max_bytes: Total size limit; least recently used entries are evicted
+                (default: RESPONSE_CACHE_MAX_MB)
+            directory: Cache root directory (default: CACHE_DIR / 'responses')
+        """
+        self.directory = (directory or CACHE_DIR / 'responses') / namespace
+        self.max_bytes = max_bytes if max_bytes is not None else RESPONSE_CACHE_MAX_MB * 1024 * 1024
+        self._lock = threading.Lock()
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / f'{key}.json'
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached value, or None if it is missing or expired."""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        
+        expires_at = entry.get('expires_at')
+        if expires_at is not None and expires_at < time.time():
+            path.unlink(missing_ok=True)
+            return None
+        
+        # Refresh mtime so eviction is least-recently-used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry['value']
+    
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        """
+        Store a value.
+        
+        Args:
+            key: Cache key, usually from fingerprint()
+            value: String value to store
+            ttl: Seconds until the entry expires, or None to keep it until evicted
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = {
+            'expires_at': time.time() + ttl if ttl is not None else None,
+            'value': value,
+        }
+        
+        # Write atomically so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+        
+        self._evict()
+    
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            
+            if total <= self.max_bytes:
+                return
+            
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
@@ -0,0 +1,168 @@
+"""
+Run Checkpoint Module.
+Persists each pipeline stage's output so a failed run can resume where it stopped.
+"""
+
+import hashlib
+import json
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from src.config import CHECKPOINT_DIR, CHECKPOINT_RETENTION_DAYS
+
+# Pipeline stages in run order; notion_draft records a Notion page that is not fully written yet
+STAGES = ('ga4_data', 'gsc_data', 'prompt', 'analysis', 'notion_draft', 'notion_page')
+
+
+def new_run_id() -> str:
+    """Create a sortable, unique run ID such as 20261015-093000-1a2b."""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(2)}"
+
+
+def _write_atomic(path: Path, text: str):
+    """Write a file atomically so an interrupted run never leaves a partial checkpoint."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _object_path(directory: Path, digest: str) -> Path:
+    """Get the file under directory holding the output with a content hash."""
+    return directory / 'objects' / digest[:2] / f'{digest}.json'
+
+
+class RunCheckpoint:
+    """
+    Stage outputs of one report run.
+
+    Outputs are stored once per content hash under objects/, so identical
+    data from different runs or sites shares a file. Each run (and site, in
+    multi-site runs) keeps a manifest mapping stage name to content hash.
+    """
+
+    def __init__(self, run_id: str = None, site: str = None, directory: Path = None):
+        """
+        Initialize the checkpoint.
+
+        Args:
+            run_id: Run to write to or resume (default: a new run ID)
+            site: Site name in a multi-site run; each site has its own manifest
+            directory: Checkpoint root directory (default: CHECKPOINT_DIR)
+        """
+        self.run_id = run_id or new_run_id()
+        self.directory = directory or CHECKPOINT_DIR
+        manifest_name = re.sub(r'[^\w.-]', '_', site) if site else 'report'
+        self.manifest_path = self.directory / self.run_id / f'{manifest_name}.json'
+        self._manifest = self._load_manifest()
+        self._lock = threading.Lock()
+
+    def _load_manifest(self) -> dict:
+        """Read this run's manifest, or an empty one if the run has not saved anything."""
+        try:
+            return json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+
+    def _object_path(self, digest: str) -> Path:
+        """Get the file holding the output with a content hash."""
+        return _object_path(self.directory, digest)
+
+    def exists(self) -> bool:
+        """Check whether this run has saved any stage yet."""
+        return bool(self._manifest)
+
+    def completed(self) -> list[str]:
+        """Get the completed stages in run order."""
+        return [stage for stage in STAGES if stage in self._manifest]
+
+    def load(self, stage: str) -> Optional[Any]:
+        """Get a stage's saved output, or None if the stage has not completed."""
+        entry = self._manifest.get(stage)
+        if entry is None:
+            return None
+        try:
+            return json.loads(self._object_path(entry['sha256']).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def save(self, stage: str, value: Any) -> str:
+        """
+        Save a stage's output and mark the stage as completed.
+
+        Returns:
+            SHA-256 content hash of the stored output
+        """
+        content = json.dumps(value, ensure_ascii=False, sort_keys=True)
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+        object_path = self._object_path(digest)
+        if not object_path.exists():
+            _write_atomic(object_path, content)
+
+        # GA4 and Search Console stages may finish at the same time
+        with self._lock:
+            self._manifest[stage] = {'sha256': digest, 'saved_at': datetime.now().isoformat()}
+            _write_atomic(self.manifest_path, json.dumps(self._manifest, indent=2))
+        return digest
+
+
+def prune_checkpoints(retention_days: int = None, directory: Path = None, keep_run: str = None) -> tuple[int, int]:
+    """
+    Delete checkpoints that can no longer be resumed usefully.
+
+    Manifests of published runs (with a notion_page stage) are removed, as are
+    manifests last saved more than retention_days ago. Stored outputs no
+    remaining manifest refers to are then removed too, unless they are newer
+    than the retention window and may belong to a run still in progress.
+
+    Args:
+        retention_days: Days unfinished runs are kept (default: CHECKPOINT_RETENTION_DAYS)
+        directory: Checkpoint root directory (default: CHECKPOINT_DIR)
+        keep_run: Run ID never pruned, e.g. the run being resumed
+
+    Returns:
+        Tuple of (manifests removed, stored outputs removed)
+    """
+    directory = directory or CHECKPOINT_DIR
+    retention_days = CHECKPOINT_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = time.time() - retention_days * 86400
+    if not directory.is_dir():
+        return 0, 0
+
+    manifests_removed = 0
+    referenced = set()
+    for run_dir in directory.iterdir():
+        if not run_dir.is_dir() or run_dir.name == 'objects':
+            continue
+        for manifest_path in run_dir.glob('*.json'):
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+                saved_at = manifest_path.stat().st_mtime
+            except (OSError, ValueError):
+                manifest, saved_at = {}, 0
+            if run_dir.name != keep_run and ('notion_page' in manifest or saved_at < cutoff):
+                manifest_path.unlink(missing_ok=True)
+                manifests_removed += 1
+            else:
+                referenced.update(entry['sha256'] for entry in manifest.values())
+        if not any(run_dir.iterdir()):
+            run_dir.rmdir()
+
+    objects_removed = 0
+    for object_path in (directory / 'objects').glob('*/*.json'):
+        try:
+            if object_path.stem not in referenced and object_path.stat().st_mtime < cutoff:
+                object_path.unlink()
+                objects_removed += 1
+        except OSError:
+            pass
+    return manifests_removed, objects_removed
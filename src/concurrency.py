@@ -0,0 +1,68 @@
+"""
+Concurrency helpers.
+Runs independent API calls side by side on a bounded thread pool.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, Optional
+
+from src.config import FETCH_CONCURRENCY
+
+
+def run_concurrently(tasks: dict[str, Callable], max_workers: int = None) -> tuple[dict, dict]:
+    """
+    Run independent callables concurrently.
+    
+    Args:
+        tasks: Mapping of task name to a zero-argument callable
+        max_workers: Maximum number of tasks running at once (default: FETCH_CONCURRENCY)
+        
+    Returns:
+        Tuple of (results, errors), both keyed by task name. Every task ends up
+        in exactly one of the two dicts.
+    """
+    max_workers = max(1, min(max_workers or FETCH_CONCURRENCY, len(tasks) or 1))
+    results = {}
+    errors = {}
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {name: executor.submit(task) for name, task in tasks.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors[name] = e
+    
+    return results, errors
+
+
+def run_all_or_raise(tasks: dict[str, Callable], max_workers: int = None) -> dict:
+    """
+    Run independent callables concurrently and raise the first failure.
+    
+    Failures are raised in task order, matching what a sequential loop over
+    the same tasks would have raised.
+    """
+    results, errors = run_concurrently(tasks, max_workers)
+    for name in tasks:
+        if name in errors:
+            raise errors[name]
+    return results
+
+
+def create_api_limits(limits: dict[str, int]) -> dict[str, threading.BoundedSemaphore]:
+    """Create one semaphore per upstream API from a mapping of API name to slot count."""
+    return {api: threading.BoundedSemaphore(max(1, slots)) for api, slots in limits.items()}
+
+
+def api_slot(api_limits: Optional[dict], api: str):
+    """
+    Get a context manager holding one of an upstream API's concurrency slots.
+    
+    Without limits for the API the returned context manager does nothing.
+    """
+    if api_limits and api in api_limits:
+        return api_limits[api]
+    return nullcontext()
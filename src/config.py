@@ -33,15 +33,99 @@ GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
 NOTION_TOKEN = os.getenv('NOTION_TOKEN', '')
 NOTION_PARENT_PAGE_ID = os.getenv('NOTION_PARENT_PAGE_ID', '')
 
+# Fetch Configuration
+# Maximum number of API requests a fetcher runs at the same time
+FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', '4'))
+
+# Local cache directory (discovery documents, API responses, checkpoints)
+CACHE_DIR = Path(os.getenv('CACHE_DIR', str(PROJECT_ROOT / '.cache')))
+
+# Response Cache Configuration
+# Set RESPONSE_CACHE=0 to always call the APIs
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE', '1') != '0'
+RESPONSE_CACHE_MAX_MB = int(os.getenv('RESPONSE_CACHE_MAX_MB', '200'))
+# Seconds to keep responses that include days whose data may still change
+RESPONSE_CACHE_FRESH_TTL = int(os.getenv('RESPONSE_CACHE_FRESH_TTL', '3600'))
+# Upstream data more than this many days old is final and cached responses never expire
+GA4_FINAL_AFTER_DAYS = 2
+GSC_FINAL_AFTER_DAYS = 3
+
+# GA4 Quota Configuration
+# Requests in flight per GA4 property (the Data API allows 10)
+GA4_CONCURRENT_REQUESTS = int(os.getenv('GA4_CONCURRENT_REQUESTS', '10'))
+# Hourly property tokens left unused so other tools sharing the property keep working
+GA4_QUOTA_RESERVE_TOKENS = int(os.getenv('GA4_QUOTA_RESERVE_TOKENS', '1000'))
+# Longest wait in seconds for the hourly token quota to refresh before failing
+# (0 fails immediately; keep it short in CI, where a run holds its slot while waiting)
+GA4_QUOTA_MAX_WAIT = float(os.getenv('GA4_QUOTA_MAX_WAIT', '300'))
+
+# Prompt Budget Configuration
+# Maximum analysis prompt tokens; data tables are shortened to fit
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '30000'))
+# How prompt tokens are counted: 'local' (estimate) or 'api' (Gemini count_tokens)
+PROMPT_TOKEN_COUNTER = os.getenv('PROMPT_TOKEN_COUNTER', 'local')
+
+# Sections generated at the same time by --sectional
+SECTION_CONCURRENCY = int(os.getenv('SECTION_CONCURRENCY', '8'))
+
+# Gemini Context Cache Configuration
+# Register the static prompt preamble once through the cached-content API:
+# 'auto' for multi-site runs only, '1' always, '0' never
+GEMINI_CONTEXT_CACHE = os.getenv('GEMINI_CONTEXT_CACHE', 'auto')
+# Seconds a registered preamble is kept by Gemini
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv('GEMINI_CONTEXT_CACHE_TTL', '3600'))
+
+# Stage outputs of each run, used by --resume
+CHECKPOINT_DIR = Path(os.getenv('CHECKPOINT_DIR', str(CACHE_DIR / 'runs')))
+# Days an unfinished run's checkpoints are kept; published runs are removed on the next run
+CHECKPOINT_RETENTION_DAYS = int(os.getenv('CHECKPOINT_RETENTION_DAYS', '14'))
+
+# Gemini Response Cache Configuration
+# Set LLM_CACHE=0 (or pass --no-llm-cache) to always call Gemini
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE', '1') != '0'
+LLM_CACHE_MAX_MB = int(os.getenv('LLM_CACHE_MAX_MB', '50'))
+
+# Day-level metrics warehouse used by --warehouse
+WAREHOUSE_PATH = Path(os.getenv('WAREHOUSE_PATH', str(CACHE_DIR / 'warehouse.sqlite')))
+
+# Multi-site Configuration
+# Sites processed at the same time by --sites
+SITE_CONCURRENCY = int(os.getenv('SITE_CONCURRENCY', '8'))
+# Calls in flight per upstream API, shared by all sites so each API stays within its quota
+API_CONCURRENCY = {
+    'ga4': int(os.getenv('GA4_CONCURRENCY', '4')),
+    'gsc': int(os.getenv('GSC_CONCURRENCY', '4')),
+    'gemini': int(os.getenv('GEMINI_CONCURRENCY', '2')),
+    'notion': int(os.getenv('NOTION_CONCURRENCY', '2')),
+}
+
+# Retry Configuration
+# Attempts per upstream call, including the first
+RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', '5'))
+# Backoff window in seconds for the first retry, doubled per attempt up to RETRY_MAX_DELAY
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '1'))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '60'))
+# Retries allowed per upstream API across the whole run, so an outage fails fast
+RETRY_BUDGETS = {
+    'ga4': int(os.getenv('GA4_RETRY_BUDGET', '20')),
+    'gsc': int(os.getenv('GSC_RETRY_BUDGET', '20')),
+    'gemini': int(os.getenv('GEMINI_RETRY_BUDGET', '6')),
+    'notion': int(os.getenv('NOTION_RETRY_BUDGET', '10')),
+}
+
 # Report Configuration
 REPORT_LANGUAGE = 'zh'  # Chinese
 REPORT_DETAIL_LEVEL = 'detailed'  # detailed | concise
 
 
-def validate_config() -> dict:
+def validate_config(require_site: bool = True) -> dict:
     """
     Validate all required configuration values are set.
     Returns a dict with validation results.
+    
+    Args:
+        require_site: Also require the single-site settings (GA4_PROPERTY_ID,
+            GSC_SITE_URL, NOTION_PARENT_PAGE_ID); a sites manifest provides them otherwise
     """
     errors = []
     warnings = []
@@ -51,11 +135,11 @@ def validate_config() -> dict:
         errors.append(f"Google Service Account JSON not found at: {GOOGLE_CREDENTIALS_PATH}")
     
     # Check GA4 Property ID
-    if not GA4_PROPERTY_ID:
+    if require_site and not GA4_PROPERTY_ID:
         errors.append("GA4_PROPERTY_ID is not set")
     
     # Check Search Console Site URL
-    if not GSC_SITE_URL:
+    if require_site and not GSC_SITE_URL:
         errors.append("GSC_SITE_URL is not set")
     
     # Check Gemini API Key
@@ -66,7 +150,7 @@ def validate_config() -> dict:
     if not NOTION_TOKEN:
         errors.append("NOTION_TOKEN is not set")
     
-    if not NOTION_PARENT_PAGE_ID:
+    if require_site and not NOTION_PARENT_PAGE_ID:
         errors.append("NOTION_PARENT_PAGE_ID is not set")
     
     return {
@@ -76,13 +160,13 @@ def validate_config() -> dict:
     }
 
 
-def print_config_status():
+def print_config_status(require_site: bool = True):
     """Print current configuration status."""
     print("=" * 50)
     print("Configuration Status")
     print("=" * 50)
     
-    result = validate_config()
+    result = validate_config(require_site)
     
     if result['valid']:
         print("✅ All configurations are valid!")
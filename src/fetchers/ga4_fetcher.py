@@ -3,26 +3,65 @@ GA4 Data Fetcher Module.
 Fetches analytics data from Google Analytics 4 using the Data API.
 """
 
+import asyncio
+import base64
 import json
 from datetime import datetime, timedelta
-from typing import Optional
-from google.analytics.data_v1beta import BetaAnalyticsDataClient
+from typing import AsyncIterator, Iterator, Optional
+from google.analytics.data_v1beta import BetaAnalyticsDataAsyncClient, BetaAnalyticsDataClient
 from google.analytics.data_v1beta.types import (
+    BatchRunReportsRequest,
     RunReportRequest,
+    RunReportResponse,
     DateRange,
     Dimension,
     Metric,
     OrderBy,
 )
-from google.oauth2 import service_account
 
-from src.config import GOOGLE_CREDENTIALS_PATH, GA4_PROPERTY_ID
+from src.aggregation import (
+    COMPARISON_MODES,
+    DailySeries,
+    comparison_range,
+    covering_spans,
+    ga4_overview_values,
+    scale_values,
+)
+from src.cache import ResponseCache, finality_ttl, fingerprint
+from src.concurrency import run_all_or_raise
+from src.config import (
+    FETCH_CONCURRENCY,
+    GA4_FINAL_AFTER_DAYS,
+    GA4_PROPERTY_ID,
+    GOOGLE_CREDENTIALS_PATH,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_FRESH_TTL,
+)
+from src.fetchers.google_auth import get_ga4_async_client, get_ga4_client
+from src.quota import estimate_cost, get_scheduler
+from src.retry import acall_with_retry, call_with_retry
+from src.warehouse import GA4_DAILY_COLUMNS, Warehouse, date_span
+
+# Metrics requested for the overview section, in response column order
+OVERVIEW_METRICS = ['activeUsers', 'sessions', 'bounceRate', 'averageSessionDuration',
+                    'screenPageViews', 'newUsers', 'engagementRate']
+
+# Maximum number of requests accepted by a single batchRunReports call
+BATCH_SIZE = 5
+
+# Overview metrics that are ratios or averages and do not scale with period length
+RATE_METRICS = {'bounceRate', 'averageSessionDuration', 'engagementRate'}
+
+# Maximum number of rows the Data API returns per page
+MAX_PAGE_SIZE = 250000
 
 
 class GA4Fetcher:
     """Fetches data from Google Analytics 4."""
     
-    def __init__(self, credentials_path: Optional[str] = None, property_id: Optional[str] = None, date_range: dict = None):
+    def __init__(self, credentials_path: Optional[str] = None, property_id: Optional[str] = None, date_range: dict = None,
+                 use_cache: Optional[bool] = None, warehouse: Optional[Warehouse] = None,
+                 comparison: str = 'previous'):
         """
         Initialize the GA4 Fetcher.
         
@@ -30,24 +69,37 @@ class GA4Fetcher:
             credentials_path: Path to service account JSON file
             property_id: GA4 Property ID (format: properties/XXXXXXXXX or just the number)
             date_range: Optional dict with 'start' and 'end' keys for custom date range
+            use_cache: Serve repeated requests from the on-disk response cache
+                (default: RESPONSE_CACHE_ENABLED)
+            warehouse: Optional day-level warehouse; the overview is then aggregated
+                locally and only missing or not-yet-final days are fetched
+            comparison: Overview comparison period, one of COMPARISON_MODES
         """
+        if comparison not in COMPARISON_MODES:
+            raise ValueError(f"Unknown comparison mode: {comparison}")
+        
         self.credentials_path = credentials_path or GOOGLE_CREDENTIALS_PATH
         self.property_id = property_id or GA4_PROPERTY_ID
         self.custom_date_range = date_range
+        self.warehouse = warehouse
+        self.comparison = comparison
+        
+        if use_cache is None:
+            use_cache = RESPONSE_CACHE_ENABLED
+        self.response_cache = ResponseCache('ga4') if use_cache else None
         
         # Normalize property ID format
         if self.property_id and not self.property_id.startswith('properties/'):
             self.property_id = f'properties/{self.property_id}'
         
+        # Paces requests against the property quota reported on each response
+        self.quota = get_scheduler(self.property_id)
+        
         self.client = self._create_client()
     
     def _create_client(self) -> BetaAnalyticsDataClient:
-        """Create authenticated GA4 client."""
-        credentials = service_account.Credentials.from_service_account_file(
-            self.credentials_path,
-            scopes=['https://www.googleapis.com/auth/analytics.readonly']
-        )
-        return BetaAnalyticsDataClient(credentials=credentials)
+        """Get the authenticated GA4 client shared by all fetchers using this key."""
+        return get_ga4_client(self.credentials_path)
     
     def _get_date_ranges(self) -> tuple[tuple[str, str], tuple[str, str]]:
         """
@@ -77,6 +129,87 @@ class GA4Fetcher:
             (previous_start.strftime('%Y-%m-%d'), previous_end.strftime('%Y-%m-%d'))
         )
     
+    def _get_overview_ranges(self) -> tuple[tuple[str, str], tuple[str, str], float]:
+        """
+        Get the current period, the overview comparison period and the factor
+        that scales comparison totals to the current period's length.
+        """
+        current_range, _ = self._get_date_ranges()
+        compare_range, scale = comparison_range(current_range, self.comparison)
+        return current_range, compare_range, scale
+    
+    def _cached_report(self, request: RunReportRequest) -> Optional[RunReportResponse]:
+        """Get a report response from the on-disk cache, if present."""
+        if self.response_cache is None:
+            return None
+        value = self.response_cache.get(fingerprint(self.property_id, RunReportRequest.to_dict(request)))
+        if value is None:
+            return None
+        return RunReportResponse.deserialize(base64.b64decode(value))
+    
+    def _store_report(self, request: RunReportRequest, response: RunReportResponse):
+        """Store a report response, keeping it forever once its data is final."""
+        if self.response_cache is None:
+            return
+        end_date = max(date_range.end_date for date_range in request.date_ranges)
+        self.response_cache.set(
+            fingerprint(self.property_id, RunReportRequest.to_dict(request)),
+            base64.b64encode(RunReportResponse.serialize(response)).decode('ascii'),
+            ttl=finality_ttl(end_date, GA4_FINAL_AFTER_DAYS, RESPONSE_CACHE_FRESH_TTL)
+        )
+    
+    def _request_quota(self, requests: list):
+        """Ask for the property quota on every response so the scheduler can track it."""
+        for request in requests:
+            request.return_property_quota = True
+    
+    def _run_report(self, request: RunReportRequest) -> RunReportResponse:
+        """Run a report, serving it from the response cache when possible."""
+        self._request_quota([request])
+        response = self._cached_report(request)
+        if response is None:
+            # The quota slot is held per attempt, not while waiting to retry
+            response = call_with_retry('ga4', self.client.run_report, request,
+                                       slot=lambda: self.quota.slot(estimate_cost(request)))
+            self.quota.record(request, response.property_quota)
+            self._store_report(request, response)
+        return response
+    
+    def _page_request(self, request: RunReportRequest, offset: int, limit: int) -> RunReportRequest:
+        """Copy a report request with the given pagination window."""
+        page_request = RunReportRequest()
+        RunReportRequest.copy_from(page_request, request)
+        page_request.offset = offset
+        page_request.limit = limit
+        return page_request
+    
+    def iter_report_rows(self, request: RunReportRequest, max_rows: Optional[int] = None) -> Iterator:
+        """
+        Yield the rows of a report lazily, paging with offset/limit.
+        
+        Only one page of up to MAX_PAGE_SIZE rows is held in memory at a time,
+        so full inventories of large sites can be streamed.
+        
+        Args:
+            request: Report request; its own offset is used as the starting point
+            max_rows: Stop after this many rows (default: all rows)
+        """
+        offset = request.offset
+        remaining = max_rows
+        
+        while remaining is None or remaining > 0:
+            page_size = MAX_PAGE_SIZE if remaining is None else min(MAX_PAGE_SIZE, remaining)
+            response = self._run_report(self._page_request(request, offset, page_size))
+            
+            yield from response.rows
+            
+            fetched = len(response.rows)
+            offset += fetched
+            if remaining is not None:
+                remaining -= fetched
+            if fetched < page_size or offset >= response.row_count:
+                break
+    
     def fetch_overview_metrics(self) -> dict:
         """
         Fetch key overview metrics comparing current week vs previous week.
@@ -84,58 +217,73 @@ class GA4Fetcher:
         Returns:
             Dict with current and previous period data, plus calculated changes.
         """
-        current_range, previous_range = self._get_date_ranges()
-        
-        metrics = [
-            Metric(name='activeUsers'),
-            Metric(name='sessions'),
-            Metric(name='bounceRate'),
-            Metric(name='averageSessionDuration'),
-            Metric(name='screenPageViews'),
-            Metric(name='newUsers'),
-            Metric(name='engagementRate'),
-        ]
+        if self.warehouse is not None:
+            return self._fetch_overview_from_warehouse()
         
-        # Fetch current period
-        current_request = RunReportRequest(
-            property=self.property_id,
-            date_ranges=[DateRange(start_date=current_range[0], end_date=current_range[1])],
-            metrics=metrics,
-        )
-        current_response = self.client.run_report(current_request)
+        current_range, compare_range, scale = self._get_overview_ranges()
         
-        # Fetch previous period
-        previous_request = RunReportRequest(
+        # Fetch both periods in one request; rows carry a dateRange dimension
+        request = self._build_overview_request(current_range, compare_range)
+        response = self._run_report(request)
+        
+        return self._process_overview_response(response, current_range, compare_range, scale)
+    
+    def _build_overview_request(self, current_range, previous_range) -> RunReportRequest:
+        """Build the overview request covering both comparison periods."""
+        return RunReportRequest(
             property=self.property_id,
-            date_ranges=[DateRange(start_date=previous_range[0], end_date=previous_range[1])],
-            metrics=metrics,
+            date_ranges=self._comparison_date_ranges(current_range, previous_range),
+            metrics=[Metric(name=name) for name in OVERVIEW_METRICS],
         )
-        previous_response = self.client.run_report(previous_request)
+    
+    def _comparison_date_ranges(self, current_range, previous_range) -> list[DateRange]:
+        """Build named date ranges so a single request covers both periods."""
+        return [
+            DateRange(start_date=current_range[0], end_date=current_range[1], name='current'),
+            DateRange(start_date=previous_range[0], end_date=previous_range[1], name='previous'),
+        ]
+    
+    def _split_rows_by_date_range(self, response) -> dict:
+        """
+        Group the rows of a multi-range response by date range name.
         
-        return self._process_overview_response(
-            current_response, previous_response,
-            current_range, previous_range
-        )
+        GA4 appends a 'dateRange' dimension whenever a request has more than one
+        date range, so its position is looked up from the dimension headers.
+        """
+        header_names = [header.name for header in response.dimension_headers]
+        range_index = header_names.index('dateRange')
+        
+        rows_by_range = {}
+        for row in response.rows:
+            range_name = row.dimension_values[range_index].value
+            rows_by_range.setdefault(range_name, []).append(row)
+        return rows_by_range
     
-    def _process_overview_response(self, current, previous, current_range, previous_range) -> dict:
-        """Process overview metrics response."""
-        metric_names = ['activeUsers', 'sessions', 'bounceRate', 'averageSessionDuration', 
-                        'screenPageViews', 'newUsers', 'engagementRate']
+    def _process_overview_response(self, response, current_range, previous_range, scale: float = 1.0) -> dict:
+        """Process overview metrics response for the current and previous periods."""
+        rows_by_range = self._split_rows_by_date_range(response)
+        current_rows = rows_by_range.get('current', [])
+        previous_rows = rows_by_range.get('previous', [])
         
         current_values = {}
         previous_values = {}
         
-        if current.rows:
-            for i, name in enumerate(metric_names):
-                current_values[name] = float(current.rows[0].metric_values[i].value)
+        if current_rows:
+            for i, name in enumerate(OVERVIEW_METRICS):
+                current_values[name] = float(current_rows[0].metric_values[i].value)
         
-        if previous.rows:
-            for i, name in enumerate(metric_names):
-                previous_values[name] = float(previous.rows[0].metric_values[i].value)
+        if previous_rows:
+            for i, name in enumerate(OVERVIEW_METRICS):
+                previous_values[name] = float(previous_rows[0].metric_values[i].value)
+        previous_values = scale_values(previous_values, scale, RATE_METRICS)
         
+        return self._build_overview(current_values, previous_values, current_range, previous_range)
+    
+    def _build_overview(self, current_values, previous_values, current_range, previous_range) -> dict:
+        """Combine both periods' overview metrics with their percentage changes."""
         # Calculate percentage changes
         changes = {}
-        for name in metric_names:
+        for name in OVERVIEW_METRICS:
             curr_val = current_values.get(name, 0)
             prev_val = previous_values.get(name, 0)
             if prev_val > 0:
@@ -146,18 +294,108 @@ class GA4Fetcher:
         return {
             'period': {
                 'current': {'start': current_range[0], 'end': current_range[1]},
-                'previous': {'start': previous_range[0], 'end': previous_range[1]}
+                'previous': {'start': previous_range[0], 'end': previous_range[1]},
+                'comparison': self.comparison
             },
             'current': current_values,
             'previous': previous_values,
             'changes': changes
         }
     
-    def fetch_traffic_sources(self, limit: int = 10) -> dict:
-        """Fetch traffic source breakdown."""
-        current_range, previous_range = self._get_date_ranges()
+    def fetch_daily_metrics(self, start_date: str, end_date: str) -> list[dict]:
+        """
+        Fetch day-level additive metrics in warehouse column form.
+        
+        Days without any data are returned as zero rows so they are stored
+        and not requested again.
+        """
+        request = self._build_daily_request(start_date, end_date)
+        return self._process_daily_rows(self.iter_report_rows(request), start_date, end_date)
+    
+    def _build_daily_request(self, start_date: str, end_date: str) -> RunReportRequest:
+        """Build the day-level request for the warehouse columns."""
+        return RunReportRequest(
+            property=self.property_id,
+            date_ranges=[DateRange(start_date=start_date, end_date=end_date)],
+            dimensions=[Dimension(name='date')],
+            metrics=[Metric(name=name) for name in GA4_DAILY_COLUMNS.values()],
+        )
+    
+    def _process_daily_rows(self, rows, start_date: str, end_date: str) -> list[dict]:
+        """Convert day-level report rows to warehouse rows, filling days without data with zeros."""
+        days = {
+            date: {'date': date, **{column: 0.0 for column in GA4_DAILY_COLUMNS}}
+            for date in date_span(start_date, end_date)
+        }
+        for row in rows:
+            raw_date = row.dimension_values[0].value  # YYYYMMDD
+            date = f'{raw_date[:4]}-{raw_date[4:6]}-{raw_date[6:]}'
+            values = {
+                column: float(row.metric_values[i].value)
+                for i, column in enumerate(GA4_DAILY_COLUMNS)
+            }
+            values['session_duration'] *= values['sessions']  # Average -> total duration
+            days[date] = {'date': date, **values}
+        
+        return list(days.values())
+    
+    def _sync_warehouse(self, start_date: str, end_date: str):
+        """Fetch the days in a range that the warehouse is missing or holds as not final."""
+        missing = self.warehouse.missing_dates('ga4_daily', self.property_id, start_date, end_date)
+        if missing:
+            rows = self.fetch_daily_metrics(missing[0], missing[-1])
+            self.warehouse.upsert_days('ga4_daily', self.property_id, rows, GA4_FINAL_AFTER_DAYS)
+    
+    def _fetch_overview_from_warehouse(self) -> dict:
+        """Aggregate the overview for both periods from warehouse days."""
+        current_range, compare_range, scale = self._get_overview_ranges()
+        
+        for span in covering_spans([current_range, compare_range]):
+            self._sync_warehouse(*span)
+        
+        users_response = self._run_report(self._build_active_users_request(current_range, compare_range))
+        return self._aggregate_warehouse_overview(users_response, current_range, compare_range, scale)
+    
+    def _build_active_users_request(self, current_range, previous_range) -> RunReportRequest:
+        """Build the request for distinct users per period, which cannot be summed across days."""
+        return RunReportRequest(
+            property=self.property_id,
+            date_ranges=self._comparison_date_ranges(current_range, previous_range),
+            metrics=[Metric(name='activeUsers')],
+        )
+    
+    def _aggregate_warehouse_overview(self, users_response, current_range, compare_range, scale: float) -> dict:
+        """Build the overview from synced warehouse days and the active users response."""
+        rows = []
+        for span in covering_spans([current_range, compare_range]):
+            rows.extend(self.warehouse.daily_rows('ga4_daily', self.property_id, *span))
+        series = DailySeries(rows, GA4_DAILY_COLUMNS)
+        
+        users_by_range = self._split_rows_by_date_range(users_response)
+        active_users = {
+            name: float(user_rows[0].metric_values[0].value) if user_rows else 0.0
+            for name, user_rows in (('current', users_by_range.get('current')),
+                                    ('previous', users_by_range.get('previous')))
+        }
+        
+        current_values = ga4_overview_values(series.totals(*current_range), active_users['current'])
+        previous_values = ga4_overview_values(
+            series.totals(*compare_range, scale=scale), active_users['previous'] * scale
+        )
+        return self._build_overview(current_values, previous_values, current_range, compare_range)
+    
+    def fetch_traffic_sources(self, limit: Optional[int] = 10) -> dict:
+        """Fetch traffic source breakdown (all sources if limit is None)."""
+        current_range, _ = self._get_date_ranges()
+        
+        request = self._build_traffic_sources_request(current_range, limit)
+        rows = list(self.iter_report_rows(request, max_rows=limit))
         
-        request = RunReportRequest(
+        return self._process_traffic_sources_rows(rows, current_range)
+    
+    def _build_traffic_sources_request(self, current_range, limit: Optional[int]) -> RunReportRequest:
+        """Build the traffic source breakdown request."""
+        return RunReportRequest(
             property=self.property_id,
             date_ranges=[DateRange(start_date=current_range[0], end_date=current_range[1])],
             dimensions=[
@@ -172,11 +410,11 @@ class GA4Fetcher:
             order_bys=[OrderBy(metric=OrderBy.MetricOrderBy(metric_name='sessions'), desc=True)],
             limit=limit
         )
-        
-        response = self.client.run_report(request)
-        
+    
+    def _process_traffic_sources_rows(self, rows, current_range) -> dict:
+        """Process traffic source breakdown rows."""
         sources = []
-        for row in response.rows:
+        for row in rows:
             sources.append({
                 'source': row.dimension_values[0].value,
                 'medium': row.dimension_values[1].value,
@@ -190,11 +428,18 @@ class GA4Fetcher:
             'sources': sources
         }
     
-    def fetch_top_pages(self, limit: int = 15) -> dict:
-        """Fetch top performing pages."""
+    def fetch_top_pages(self, limit: Optional[int] = 15) -> dict:
+        """Fetch top performing pages (the full page inventory if limit is None)."""
         current_range, _ = self._get_date_ranges()
         
-        request = RunReportRequest(
+        request = self._build_top_pages_request(current_range, limit)
+        rows = list(self.iter_report_rows(request, max_rows=limit))
+        
+        return self._process_top_pages_rows(rows, current_range)
+    
+    def _build_top_pages_request(self, current_range, limit: Optional[int]) -> RunReportRequest:
+        """Build the top pages request."""
+        return RunReportRequest(
             property=self.property_id,
             date_ranges=[DateRange(start_date=current_range[0], end_date=current_range[1])],
             dimensions=[Dimension(name='pagePath')],
@@ -207,11 +452,11 @@ class GA4Fetcher:
             order_bys=[OrderBy(metric=OrderBy.MetricOrderBy(metric_name='screenPageViews'), desc=True)],
             limit=limit
         )
-        
-        response = self.client.run_report(request)
-        
+    
+    def _process_top_pages_rows(self, rows, current_range) -> dict:
+        """Process top pages rows."""
         pages = []
-        for row in response.rows:
+        for row in rows:
             engagement_duration = float(row.metric_values[1].value)
             active_users = int(row.metric_values[2].value) or 1  # Avoid division by zero
             avg_engagement_per_user = engagement_duration / active_users  # Seconds per user
@@ -232,7 +477,14 @@ class GA4Fetcher:
         """Fetch device category breakdown."""
         current_range, _ = self._get_date_ranges()
         
-        request = RunReportRequest(
+        request = self._build_device_breakdown_request(current_range)
+        response = self._run_report(request)
+        
+        return self._process_device_breakdown_rows(response.rows, current_range)
+    
+    def _build_device_breakdown_request(self, current_range) -> RunReportRequest:
+        """Build the device category breakdown request."""
+        return RunReportRequest(
             property=self.property_id,
             date_ranges=[DateRange(start_date=current_range[0], end_date=current_range[1])],
             dimensions=[Dimension(name='deviceCategory')],
@@ -243,13 +495,13 @@ class GA4Fetcher:
                 Metric(name='averageSessionDuration'),
             ],
         )
-        
-        response = self.client.run_report(request)
-        
+    
+    def _process_device_breakdown_rows(self, rows, current_range) -> dict:
+        """Process device category breakdown rows."""
         devices = []
-        total_sessions = sum(int(row.metric_values[0].value) for row in response.rows)
+        total_sessions = sum(int(row.metric_values[0].value) for row in rows)
         
-        for row in response.rows:
+        for row in rows:
             sessions = int(row.metric_values[0].value)
             devices.append({
                 'device': row.dimension_values[0].value,
@@ -265,11 +517,18 @@ class GA4Fetcher:
             'devices': devices
         }
     
-    def fetch_geo_breakdown(self, limit: int = 10) -> dict:
-        """Fetch geographic breakdown by country."""
+    def fetch_geo_breakdown(self, limit: Optional[int] = 10) -> dict:
+        """Fetch geographic breakdown by country (all countries if limit is None)."""
         current_range, _ = self._get_date_ranges()
         
-        request = RunReportRequest(
+        request = self._build_geo_breakdown_request(current_range, limit)
+        rows = list(self.iter_report_rows(request, max_rows=limit))
+        
+        return self._process_geo_breakdown_rows(rows, current_range)
+    
+    def _build_geo_breakdown_request(self, current_range, limit: Optional[int]) -> RunReportRequest:
+        """Build the geographic breakdown request."""
+        return RunReportRequest(
             property=self.property_id,
             date_ranges=[DateRange(start_date=current_range[0], end_date=current_range[1])],
             dimensions=[Dimension(name='country')],
@@ -280,13 +539,13 @@ class GA4Fetcher:
             order_bys=[OrderBy(metric=OrderBy.MetricOrderBy(metric_name='sessions'), desc=True)],
             limit=limit
         )
-        
-        response = self.client.run_report(request)
-        
+    
+    def _process_geo_breakdown_rows(self, rows, current_range) -> dict:
+        """Process geographic breakdown rows."""
         countries = []
-        total_sessions = sum(int(row.metric_values[0].value) for row in response.rows)
+        total_sessions = sum(int(row.metric_values[0].value) for row in rows)
         
-        for row in response.rows:
+        for row in rows:
             sessions = int(row.metric_values[0].value)
             countries.append({
                 'country': row.dimension_values[0].value,
@@ -300,10 +559,78 @@ class GA4Fetcher:
             'countries': countries
         }
     
-    def fetch_all_data(self) -> dict:
+    def _run_batch(self, requests: list) -> list:
+        """
+        Send report requests through batchRunReports.
+        
+        The API accepts at most BATCH_SIZE requests per call, so larger lists are
+        split into groups, cheapest first so that a low quota delays as few
+        sections as possible. Responses are returned in request order.
+        """
+        self._request_quota(requests)
+        
+        # Only requests missing from the response cache are sent
+        responses = [self._cached_report(request) for request in requests]
+        misses = [i for i in self.quota.order(requests) if responses[i] is None]
+        
+        for start in range(0, len(misses), BATCH_SIZE):
+            indexes = misses[start:start + BATCH_SIZE]
+            batch_request = BatchRunReportsRequest(
+                property=self.property_id,
+                requests=[requests[i] for i in indexes],
+            )
+            cost = sum(estimate_cost(requests[i]) for i in indexes)
+            batch_response = call_with_retry('ga4', self.client.batch_run_reports, batch_request,
+                                             slot=lambda: self.quota.slot(cost))
+            for i, report in zip(indexes, batch_response.reports):
+                self.quota.record(requests[i], report.property_quota)
+                self._store_report(requests[i], report)
+                responses[i] = report
+        return responses
+    
+    def _batched_sections(self) -> list:
+        """Get (data key, request, response processor) for every report section."""
+        current_range, compare_range, scale = self._get_overview_ranges()
+        
+        return [
+            ('overview', self._build_overview_request(current_range, compare_range),
+             lambda r: self._process_overview_response(r, current_range, compare_range, scale)),
+            ('traffic_sources', self._build_traffic_sources_request(current_range, 10),
+             lambda r: self._process_traffic_sources_rows(r.rows, current_range)),
+            ('top_pages', self._build_top_pages_request(current_range, 15),
+             lambda r: self._process_top_pages_rows(r.rows, current_range)),
+            ('devices', self._build_device_breakdown_request(current_range),
+             lambda r: self._process_device_breakdown_rows(r.rows, current_range)),
+            ('geo', self._build_geo_breakdown_request(current_range, 10),
+             lambda r: self._process_geo_breakdown_rows(r.rows, current_range)),
+        ]
+    
+    def _fetch_all_batched(self) -> dict:
+        """Fetch every report section with batched requests."""
+        sections = self._batched_sections()
+        data = {}
+        if self.warehouse is not None:
+            # The overview is aggregated from the warehouse instead
+            sections = [section for section in sections if section[0] != 'overview']
+            data['overview'] = self._fetch_overview_from_warehouse()
+        
+        responses = self._run_batch([request for _, request, _ in sections])
+        data.update(
+            (key, process(response))
+            for (key, _, process), response in zip(sections, responses)
+        )
+        return data
+    
+    def fetch_all_data(self, batch: bool = True, max_workers: int = None) -> dict:
         """
         Fetch all GA4 data for the weekly report.
         
+        Args:
+            batch: If True, send all report requests through batchRunReports
+                instead of one run_report call per section
+            max_workers: Concurrent run_report calls when batch is False
+                (default: FETCH_CONCURRENCY)
+        
         Returns:
             Complete GA4 data dictionary with all metrics and dimensions.
         """
@@ -313,21 +640,258 @@ class GA4Fetcher:
             'source': 'Google Analytics 4',
             'property_id': self.property_id,
             'fetched_at': datetime.now().isoformat(),
-            'overview': self.fetch_overview_metrics(),
-            'traffic_sources': self.fetch_traffic_sources(),
-            'top_pages': self.fetch_top_pages(),
-            'devices': self.fetch_device_breakdown(),
-            'geo': self.fetch_geo_breakdown(),
         }
         
+        if batch:
+            data.update(self._fetch_all_batched())
+        else:
+            # The gRPC client is thread-safe, so sections can share it
+            data.update(run_all_or_raise({
+                'overview': self.fetch_overview_metrics,
+                'traffic_sources': self.fetch_traffic_sources,
+                'top_pages': self.fetch_top_pages,
+                'devices': self.fetch_device_breakdown,
+                'geo': self.fetch_geo_breakdown,
+            }, max_workers))
+        
+        data['quota'] = self.quota.snapshot()
         print("✅ GA4 data fetched successfully!")
+        print(f"📉 GA4 quota: {self.quota.describe()}")
+        return data
+
+
+
+class AsyncGA4Fetcher(GA4Fetcher):
+    """
+    Fetches data from Google Analytics 4 with the asyncio client.
+    
+    Public methods mirror GA4Fetcher but are coroutines, so reports for many
+    properties can be gathered on one event loop.
+    
+        fetchers = [AsyncGA4Fetcher(property_id=pid) for pid in property_ids]
+        results = await asyncio.gather(*(f.fetch_all_data() for f in fetchers))
+    """
+    
+    def _create_client(self) -> Optional[BetaAnalyticsDataAsyncClient]:
+        """Defer client creation until it is first used inside the event loop."""
+        # The async client binds its gRPC channel to the running loop
+        return None
+    
+    def _get_client(self) -> BetaAnalyticsDataAsyncClient:
+        """Get the running loop's async client shared by all fetchers using this key."""
+        return get_ga4_async_client(self.credentials_path)
+    
+    async def _run_report(self, request: RunReportRequest) -> RunReportResponse:
+        """Run a report, serving it from the response cache when possible."""
+        self._request_quota([request])
+        response = self._cached_report(request)
+        if response is None:
+            response = await acall_with_retry('ga4', self._get_client().run_report, request,
+                                              slot=lambda: self.quota.aslot(estimate_cost(request)))
+            self.quota.record(request, response.property_quota)
+            self._store_report(request, response)
+        return response
+    
+    def iter_report_rows(self, request: RunReportRequest, max_rows: Optional[int] = None) -> Iterator:
+        """Not available on the async fetcher; use aiter_report_rows()."""
+        raise TypeError(
+            "AsyncGA4Fetcher runs reports as coroutines; "
+            "use 'async for row in fetcher.aiter_report_rows(request)' instead of iter_report_rows()"
+        )
+    
+    async def aiter_report_rows(self, request: RunReportRequest, max_rows: Optional[int] = None) -> AsyncIterator:
+        """
+        Yield the rows of a report lazily, paging with offset/limit.
+        
+        Args:
+            request: Report request; its own offset is used as the starting point
+            max_rows: Stop after this many rows (default: all rows)
+        """
+        offset = request.offset
+        remaining = max_rows
+        
+        while remaining is None or remaining > 0:
+            page_size = MAX_PAGE_SIZE if remaining is None else min(MAX_PAGE_SIZE, remaining)
+            response = await self._run_report(self._page_request(request, offset, page_size))
+            
+            for row in response.rows:
+                yield row
+            
+            fetched = len(response.rows)
+            offset += fetched
+            if remaining is not None:
+                remaining -= fetched
+            if fetched < page_size or offset >= response.row_count:
+                break
+    
+    async def fetch_overview_metrics(self) -> dict:
+        """
+        Fetch key overview metrics comparing current week vs previous week.
+        
+        Returns:
+            Dict with current and previous period data, plus calculated changes.
+        """
+        if self.warehouse is not None:
+            return await self._fetch_overview_from_warehouse()
+        
+        current_range, compare_range, scale = self._get_overview_ranges()
+        
+        request = self._build_overview_request(current_range, compare_range)
+        response = await self._run_report(request)
+        
+        return self._process_overview_response(response, current_range, compare_range, scale)
+    
+    async def fetch_daily_metrics(self, start_date: str, end_date: str) -> list[dict]:
+        """Fetch day-level additive metrics in warehouse column form."""
+        request = self._build_daily_request(start_date, end_date)
+        rows = [row async for row in self.aiter_report_rows(request)]
+        return self._process_daily_rows(rows, start_date, end_date)
+    
+    async def _sync_warehouse(self, start_date: str, end_date: str):
+        """Fetch the days in a range that the warehouse is missing or holds as not final."""
+        missing = self.warehouse.missing_dates('ga4_daily', self.property_id, start_date, end_date)
+        if missing:
+            rows = await self.fetch_daily_metrics(missing[0], missing[-1])
+            self.warehouse.upsert_days('ga4_daily', self.property_id, rows, GA4_FINAL_AFTER_DAYS)
+    
+    async def _fetch_overview_from_warehouse(self) -> dict:
+        """Aggregate the overview for both periods from warehouse days."""
+        current_range, compare_range, scale = self._get_overview_ranges()
+        
+        for span in covering_spans([current_range, compare_range]):
+            await self._sync_warehouse(*span)
+        
+        users_response = await self._run_report(self._build_active_users_request(current_range, compare_range))
+        return self._aggregate_warehouse_overview(users_response, current_range, compare_range, scale)
+    
+    async def fetch_traffic_sources(self, limit: Optional[int] = 10) -> dict:
+        """Fetch traffic source breakdown (all sources if limit is None)."""
+        current_range, _ = self._get_date_ranges()
+        
+        request = self._build_traffic_sources_request(current_range, limit)
+        rows = [row async for row in self.aiter_report_rows(request, max_rows=limit)]
+        
+        return self._process_traffic_sources_rows(rows, current_range)
+    
+    async def fetch_top_pages(self, limit: Optional[int] = 15) -> dict:
+        """Fetch top performing pages (the full page inventory if limit is None)."""
+        current_range, _ = self._get_date_ranges()
+        
+        request = self._build_top_pages_request(current_range, limit)
+        rows = [row async for row in self.aiter_report_rows(request, max_rows=limit)]
+        
+        return self._process_top_pages_rows(rows, current_range)
+    
+    async def fetch_device_breakdown(self) -> dict:
+        """Fetch device category breakdown."""
+        current_range, _ = self._get_date_ranges()
+        
+        request = self._build_device_breakdown_request(current_range)
+        response = await self._run_report(request)
+        
+        return self._process_device_breakdown_rows(response.rows, current_range)
+    
+    async def fetch_geo_breakdown(self, limit: Optional[int] = 10) -> dict:
+        """Fetch geographic breakdown by country (all countries if limit is None)."""
+        current_range, _ = self._get_date_ranges()
+        
+        request = self._build_geo_breakdown_request(current_range, limit)
+        rows = [row async for row in self.aiter_report_rows(request, max_rows=limit)]
+        
+        return self._process_geo_breakdown_rows(rows, current_range)
+    
+    async def _run_batch(self, requests: list) -> list:
+        """Send report requests through batchRunReports, one call per group concurrently."""
+        self._request_quota(requests)
+        
+        # Only requests missing from the response cache are sent
+        responses = [self._cached_report(request) for request in requests]
+        misses = [i for i in self.quota.order(requests) if responses[i] is None]
+        
+        async def run_group(indexes):
+            cost = sum(estimate_cost(requests[i]) for i in indexes)
+            return await acall_with_retry('ga4', self._get_client().batch_run_reports, BatchRunReportsRequest(
+                property=self.property_id,
+                requests=[requests[i] for i in indexes],
+            ), slot=lambda: self.quota.aslot(cost))
+        
+        groups = [misses[start:start + BATCH_SIZE] for start in range(0, len(misses), BATCH_SIZE)]
+        batch_responses = await asyncio.gather(*(run_group(indexes) for indexes in groups))
+        
+        for indexes, batch_response in zip(groups, batch_responses):
+            for i, report in zip(indexes, batch_response.reports):
+                self.quota.record(requests[i], report.property_quota)
+                self._store_report(requests[i], report)
+                responses[i] = report
+        return responses
+    
+    async def _fetch_all_batched(self) -> dict:
+        """Fetch every report section with batched requests."""
+        sections = self._batched_sections()
+        data = {}
+        if self.warehouse is not None:
+            # The overview is aggregated from the warehouse instead
+            sections = [section for section in sections if section[0] != 'overview']
+            data['overview'] = await self._fetch_overview_from_warehouse()
+        
+        responses = await self._run_batch([request for _, request, _ in sections])
+        data.update(
+            (key, process(response))
+            for (key, _, process), response in zip(sections, responses)
+        )
+        return data
+    
+    async def fetch_all_data(self, batch: bool = True, max_workers: int = None) -> dict:
+        """
+        Fetch all GA4 data for the weekly report.
+        
+        Args:
+            batch: If True, send all report requests through batchRunReports
+                instead of one run_report call per section
+            max_workers: Concurrent run_report calls when batch is False
+                (default: FETCH_CONCURRENCY)
+        
+        Returns:
+            Complete GA4 data dictionary with all metrics and dimensions.
+        """
+        print(f"📊 Fetching GA4 data for {self.property_id}...")
+        
+        data = {
+            'source': 'Google Analytics 4',
+            'property_id': self.property_id,
+            'fetched_at': datetime.now().isoformat(),
+        }
+        
+        if batch:
+            data.update(await self._fetch_all_batched())
+        else:
+            semaphore = asyncio.Semaphore(max_workers or FETCH_CONCURRENCY)
+            
+            async def bounded(coroutine):
+                async with semaphore:
+                    return await coroutine
+            
+            sections = {
+                'overview': self.fetch_overview_metrics(),
+                'traffic_sources': self.fetch_traffic_sources(),
+                'top_pages': self.fetch_top_pages(),
+                'devices': self.fetch_device_breakdown(),
+                'geo': self.fetch_geo_breakdown(),
+            }
+            results = await asyncio.gather(*(bounded(c) for c in sections.values()))
+            data.update(zip(sections.keys(), results))
+        
+        data['quota'] = self.quota.snapshot()
+        print(f"✅ GA4 data fetched successfully for {self.property_id}!")
+        print(f"📉 GA4 quota: {self.quota.describe()}")
         return data
 
 
 def test_connection() -> bool:
     """Test GA4 API connection."""
     try:
-        fetcher = GA4Fetcher()
+        # Bypass the response cache so the test really reaches the API
+        fetcher = GA4Fetcher(use_cache=False)
         # Just try to fetch basic data
         fetcher.fetch_overview_metrics()
         return True
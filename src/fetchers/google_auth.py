@@ -0,0 +1,125 @@
+"""
+Google Credentials Registry.
+Shares service account credentials and API transports across all Google fetchers.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+
+import httplib2
+from google.analytics.data_v1beta import BetaAnalyticsDataAsyncClient, BetaAnalyticsDataClient
+from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.http import build_http
+
+GA4_SCOPES = ('https://www.googleapis.com/auth/analytics.readonly',)
+GSC_SCOPES = ('https://www.googleapis.com/auth/webmasters.readonly',)
+
+_lock = threading.Lock()
+
+# Key file path -> unscoped credentials parsed from the JSON key
+_base_credentials = {}
+
+# (key file path, scopes) -> scoped credentials holding the cached access token
+_scoped_credentials = {}
+
+# Key file path -> GA4 client; the client and its gRPC channel are thread-safe
+_ga4_clients = {}
+
+# Event loop -> key file path -> async GA4 client; async channels are bound to one loop
+_ga4_async_clients = weakref.WeakKeyDictionary()
+
+# Per-thread HTTP transports, since httplib2 is not thread-safe
+_local = threading.local()
+
+
+def get_credentials(credentials_path: str, scopes: tuple) -> service_account.Credentials:
+    """
+    Get shared credentials for a service account key and scope set.
+    
+    The key file is read once per process. Credentials keep their access token
+    until it expires, so every fetcher using the same scopes shares one token
+    instead of minting its own.
+    """
+    scopes = tuple(scopes)
+    with _lock:
+        credentials = _scoped_credentials.get((credentials_path, scopes))
+        if credentials is None:
+            base = _base_credentials.get(credentials_path)
+            if base is None:
+                base = service_account.Credentials.from_service_account_file(credentials_path)
+                _base_credentials[credentials_path] = base
+            credentials = base.with_scopes(list(scopes))
+            _scoped_credentials[(credentials_path, scopes)] = credentials
+    return credentials
+
+
+def get_ga4_client(credentials_path: str) -> BetaAnalyticsDataClient:
+    """Get the GA4 Data API client shared by all fetchers using this key."""
+    with _lock:
+        client = _ga4_clients.get(credentials_path)
+    if client is None:
+        client = BetaAnalyticsDataClient(credentials=get_credentials(credentials_path, GA4_SCOPES))
+        with _lock:
+            client = _ga4_clients.setdefault(credentials_path, client)
+    return client
+
+
+def get_ga4_async_client(credentials_path: str) -> BetaAnalyticsDataAsyncClient:
+    """
+    Get the async GA4 Data API client shared by all fetchers using this key.
+    
+    Must be called inside the event loop the client will run on; each loop
+    gets its own client, since async gRPC channels cannot move between loops.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _ga4_async_clients.get(loop)
+        if clients is None:
+            clients = _ga4_async_clients[loop] = {}
+        client = clients.get(credentials_path)
+    if client is None:
+        client = BetaAnalyticsDataAsyncClient(credentials=get_credentials(credentials_path, GA4_SCOPES))
+        with _lock:
+            client = clients.setdefault(credentials_path, client)
+    return client
+
+
+def create_authorized_http(credentials_path: str, scopes: tuple) -> AuthorizedHttp:
+    """Create a new authorized HTTP transport with proxy support."""
+    http = build_http()
+    
+    # Configure proxy if available
+    proxy_url = os.getenv('HTTPS_PROXY') or os.getenv('HTTP_PROXY')
+    if proxy_url:
+        # Parse proxy URL (format: http://host:port)
+        proxy_url = proxy_url.replace('http://', '').replace('https://', '')
+        if ':' in proxy_url:
+            proxy_host, proxy_port = proxy_url.split(':')
+            proxy_info = httplib2.ProxyInfo(
+                httplib2.socks.PROXY_TYPE_HTTP,
+                proxy_host,
+                int(proxy_port)
+            )
+            http = httplib2.Http(proxy_info=proxy_info)
+    
+    return AuthorizedHttp(get_credentials(credentials_path, scopes), http=http)
+
+
+def get_authorized_http(credentials_path: str, scopes: tuple) -> AuthorizedHttp:
+    """
+    Get the calling thread's pooled HTTP transport for a key and scope set.
+    
+    Each thread reuses one connection per key across all fetcher instances.
+    """
+    pool = getattr(_local, 'pool', None)
+    if pool is None:
+        pool = _local.pool = {}
+    
+    key = (credentials_path, tuple(scopes))
+    http = pool.get(key)
+    if http is None:
+        http = pool[key] = create_authorized_http(credentials_path, scopes)
+    return http
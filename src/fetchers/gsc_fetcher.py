@@ -3,20 +3,96 @@ Google Search Console Data Fetcher Module.
 Fetches search performance data from Google Search Console API.
 """
 
-import os
+import csv
+import functools
+import json
+import re
+import threading
 from datetime import datetime, timedelta
-from typing import Optional
-from googleapiclient.discovery import build
-from google.oauth2 import service_account
-import httplib2
+from typing import Iterator, Optional
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import build_http
+from google_auth_httplib2 import AuthorizedHttp
 
-from src.config import GOOGLE_CREDENTIALS_PATH, GSC_SITE_URL
+from src.aggregation import (
+    COMPARISON_MODES,
+    DailySeries,
+    comparison_range,
+    covering_spans,
+    gsc_overview_row,
+)
+from src.cache import ResponseCache, finality_ttl, fingerprint
+from src.concurrency import run_all_or_raise
+from src.config import (
+    CACHE_DIR,
+    GOOGLE_CREDENTIALS_PATH,
+    GSC_FINAL_AFTER_DAYS,
+    GSC_SITE_URL,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_FRESH_TTL,
+)
+from src.fetchers.google_auth import (
+    GSC_SCOPES,
+    create_authorized_http,
+    get_authorized_http,
+)
+from src.retry import call_with_retry, classify_error
+from src.warehouse import GSC_DAILY_COLUMNS, Warehouse, date_span
+
+# Maximum number of rows the Search Analytics API returns per request
+MAX_PAGE_SIZE = 25000
+
+# Maximum number of calls allowed in a single batch request
+BATCH_SIZE = 1000
+
+# Longest regex expression sent in a single query dimension filter
+QUERY_FILTER_MAX_LENGTH = 4000
+
+# Discovery document source, used when neither the disk cache nor the library bundles it
+DISCOVERY_URL = 'https://searchconsole.googleapis.com/$discovery/rest?version=v1'
+DISCOVERY_CACHE_PATH = CACHE_DIR / 'discovery' / 'searchconsole.v1.json'
+
+# Rows scanned for high-impression, low-CTR query opportunities
+OPPORTUNITY_POOL_SIZE = 100
+
+# Search Console services shared across fetcher instances, keyed by credentials path
+_services = {}
+_services_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def load_discovery_document() -> dict:
+    """
+    Load and parse the Search Console discovery document once per process.
+    
+    Looks in the on-disk cache first, then the static copy bundled with
+    google-api-python-client, and only falls back to the network if neither exists.
+    A corrupt cached copy is replaced.
+    """
+    if DISCOVERY_CACHE_PATH.exists():
+        try:
+            return json.loads(DISCOVERY_CACHE_PATH.read_text(encoding='utf-8'))
+        except ValueError:
+            # A truncated or corrupt cached copy is replaced below
+            print(f"⚠️  Ignoring corrupt discovery document cache: {DISCOVERY_CACHE_PATH}")
+    
+    document = discovery_cache.get_static_doc('searchconsole', 'v1')
+    if document is None:
+        _, content = build_http().request(DISCOVERY_URL)
+        document = content.decode('utf-8')
+    
+    DISCOVERY_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    DISCOVERY_CACHE_PATH.write_text(document, encoding='utf-8')
+    return json.loads(document)
 
 
 class GSCFetcher:
     """Fetches data from Google Search Console."""
     
-    def __init__(self, credentials_path: Optional[str] = None, site_url: Optional[str] = None, date_range: dict = None):
+    def __init__(self, credentials_path: Optional[str] = None, site_url: Optional[str] = None, date_range: dict = None,
+                 use_cache: Optional[bool] = None, warehouse: Optional[Warehouse] = None,
+                 comparison: str = 'previous'):
         """
         Initialize the GSC Fetcher.
         
@@ -24,38 +100,54 @@ class GSCFetcher:
             credentials_path: Path to service account JSON file
             site_url: Site URL registered in Search Console
             date_range: Optional dict with 'start' and 'end' keys for custom date range
+            use_cache: Serve repeated requests from the on-disk response cache
+                (default: RESPONSE_CACHE_ENABLED)
+            warehouse: Optional day-level warehouse; the overview is then aggregated
+                locally and only missing or not-yet-final days are fetched
+            comparison: Overview comparison period, one of COMPARISON_MODES
         """
+        if comparison not in COMPARISON_MODES:
+            raise ValueError(f"Unknown comparison mode: {comparison}")
+        
         self.credentials_path = credentials_path or GOOGLE_CREDENTIALS_PATH
         self.site_url = site_url or GSC_SITE_URL
         self.custom_date_range = date_range
+        self.warehouse = warehouse
+        self.comparison = comparison
+        
+        if use_cache is None:
+            use_cache = RESPONSE_CACHE_ENABLED
+        self.response_cache = ResponseCache('gsc') if use_cache else None
         self.service = self._create_service()
+        
+        # Per-run query result cache: key -> (row limit, response)
+        self._query_cache = {}
+        self._query_widths = {}
+        self._key_locks = {}
+        self._query_lock = threading.Lock()
     
     def _create_service(self):
-        """Create authenticated Search Console service with proxy support."""
-        credentials = service_account.Credentials.from_service_account_file(
-            self.credentials_path,
-            scopes=['https://www.googleapis.com/auth/webmasters.readonly']
-        )
+        """
+        Get the Search Console service for these credentials.
         
-        # Configure proxy if available
-        proxy_url = os.getenv('HTTPS_PROXY') or os.getenv('HTTP_PROXY')
-        if proxy_url:
-            # Parse proxy URL (format: http://host:port)
-            proxy_url = proxy_url.replace('http://', '').replace('https://', '')
-            if ':' in proxy_url:
-                proxy_host, proxy_port = proxy_url.split(':')
-                proxy_info = httplib2.ProxyInfo(
-                    httplib2.socks.PROXY_TYPE_HTTP,
-                    proxy_host,
-                    int(proxy_port)
+        Services are built from the memoized discovery document and shared
+        between fetcher instances. Requests always pass a per-thread transport
+        to execute(), so sharing the service object is safe.
+        """
+        with _services_lock:
+            service = _services.get(self.credentials_path)
+            if service is None:
+                service = build_from_document(
+                    load_discovery_document(),
+                    http=create_authorized_http(self.credentials_path, GSC_SCOPES)
                 )
-                http = httplib2.Http(proxy_info=proxy_info)
-                # Create authorized http with credentials
-                from google_auth_httplib2 import AuthorizedHttp
-                authed_http = AuthorizedHttp(credentials, http=http)
-                return build('searchconsole', 'v1', http=authed_http)
-        
-        return build('searchconsole', 'v1', credentials=credentials)
+                _services[self.credentials_path] = service
+        return service
+    
+    def _thread_http(self) -> AuthorizedHttp:
+        """Get the pooled HTTP transport owned by the calling thread."""
+        # httplib2 transports are not thread-safe, so each thread gets its own
+        return get_authorized_http(self.credentials_path, GSC_SCOPES)
     
     def _get_date_ranges(self) -> tuple[tuple[str, str], tuple[str, str]]:
         """
@@ -85,44 +177,323 @@ class GSCFetcher:
             (previous_start.strftime('%Y-%m-%d'), previous_end.strftime('%Y-%m-%d'))
         )
     
-    def _execute_query(self, start_date: str, end_date: str, 
-                       dimensions: list = None, row_limit: int = 1000) -> dict:
-        """Execute a Search Console query."""
+    def _get_overview_ranges(self) -> tuple[tuple[str, str], tuple[str, str], float]:
+        """
+        Get the current period, the overview comparison period and the factor
+        that scales comparison totals to the current period's length.
+        """
+        current_range, _ = self._get_date_ranges()
+        compare_range, scale = comparison_range(current_range, self.comparison)
+        return current_range, compare_range, scale
+    
+    def _build_query(self, start_date: str, end_date: str,
+                     dimensions: list = None, row_limit: int = 1000,
+                     start_row: int = 0, dimension_filter_groups: list = None) -> dict:
+        """Build a Search Console query request body."""
         request = {
             'startDate': start_date,
             'endDate': end_date,
             'dimensions': dimensions or [],
             'rowLimit': row_limit
         }
+        if start_row:
+            request['startRow'] = start_row
+        if dimension_filter_groups:
+            request['dimensionFilterGroups'] = dimension_filter_groups
+        return request
+    
+    def _execute_query(self, start_date: str, end_date: str, 
+                       dimensions: list = None, row_limit: int = 1000,
+                       start_row: int = 0, use_cache: bool = True) -> dict:
+        """Execute a Search Console query."""
+        request = self._build_query(start_date, end_date, dimensions, row_limit, start_row)
         
-        response = self.service.searchanalytics().query(
+        if not use_cache:
+            return self._send_query(request)
+        return self._execute_cached(request)
+    
+    def _send_query(self, request: dict) -> dict:
+        """Send a single query request body to the API, retrying transient failures."""
+        return call_with_retry('gsc', lambda: self.service.searchanalytics().query(
             siteUrl=self.site_url,
             body=request
-        ).execute()
+        ).execute(http=self._thread_http()))
+    
+    def _response_cache_key(self, request: dict) -> str:
+        """Fingerprint a query request body for the on-disk response cache."""
+        return fingerprint(self.site_url, request)
+    
+    def _cached_query_response(self, request: dict) -> Optional[dict]:
+        """Get a query response from the on-disk cache, if present."""
+        if self.response_cache is None:
+            return None
+        value = self.response_cache.get(self._response_cache_key(request))
+        return json.loads(value) if value is not None else None
+    
+    def _store_query_response(self, request: dict, response: dict):
+        """Store a query response, keeping it forever once its data is final."""
+        if self.response_cache is None:
+            return
+        self.response_cache.set(
+            self._response_cache_key(request),
+            json.dumps(response, ensure_ascii=False),
+            ttl=finality_ttl(request['endDate'], GSC_FINAL_AFTER_DAYS, RESPONSE_CACHE_FRESH_TTL)
+        )
+    
+    def _execute_body(self, request: dict) -> dict:
+        """Execute a query request body, serving it from the response cache when possible."""
+        response = self._cached_query_response(request)
+        if response is None:
+            response = self._send_query(request)
+            self._store_query_response(request, response)
+        return response
+    
+    def _query_key(self, request: dict) -> str:
+        """
+        Build the query cache key for a request body.
+        
+        Everything except rowLimit identifies the result set (range, dimensions,
+        filters, searchType, startRow); rowLimit only decides how much of it is needed.
+        """
+        return json.dumps(
+            {key: value for key, value in request.items() if key != 'rowLimit'},
+            sort_keys=True, ensure_ascii=False
+        )
+    
+    def _reserve_query_width(self, request: dict):
+        """Record that a query will be needed with at least this many rows."""
+        key = self._query_key(request)
+        with self._query_lock:
+            self._query_widths[key] = max(self._query_widths.get(key, 0), request['rowLimit'])
+    
+    def _widest_request(self, request: dict) -> dict:
+        """Get a copy of the request widened to the largest reserved row limit."""
+        with self._query_lock:
+            width = max(self._query_widths.get(self._query_key(request), 0), request['rowLimit'])
+        return {**request, 'rowLimit': width}
+    
+    def _cached_response(self, request: dict) -> Optional[dict]:
+        """
+        Serve a request from the query cache, or None if the cached result is too narrow.
+        
+        Search Console sorts rows by clicks, so a narrower row limit is a prefix
+        of a wider one. A cached result with fewer rows than its own row limit is
+        complete and can serve any width.
+        """
+        with self._query_lock:
+            cached = self._query_cache.get(self._query_key(request))
+        if cached is None:
+            return None
+        
+        cached_limit, response = cached
+        rows = response.get('rows', [])
+        if request['rowLimit'] > cached_limit and len(rows) >= cached_limit:
+            return None
+        
+        sliced = dict(response)
+        if 'rows' in response:
+            sliced['rows'] = rows[:request['rowLimit']]
+        return sliced
+    
+    def _store_response(self, request: dict, response: dict):
+        """Store a query response unless a wider result is already cached."""
+        key = self._query_key(request)
+        with self._query_lock:
+            cached = self._query_cache.get(key)
+            if cached is None or cached[0] < request['rowLimit']:
+                self._query_cache[key] = (request['rowLimit'], response)
+    
+    def _execute_cached(self, request: dict) -> dict:
+        """Execute a query through the per-run query cache."""
+        key = self._query_key(request)
+        with self._query_lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        
+        # Concurrent callers of the same query wait for one fetch instead of duplicating it
+        with key_lock:
+            response = self._cached_response(request)
+            if response is None:
+                widest = self._widest_request(request)
+                self._store_response(widest, self._execute_body(widest))
+                response = self._cached_response(request)
         
         return response
     
+    def _execute_cached_batch(self, requests: dict) -> dict:
+        """
+        Resolve named query bodies through the query cache, batching the misses.
+        
+        Requests that differ only in rowLimit are fetched once at the widest limit.
+        
+        Args:
+            requests: Mapping of request name to query request body
+            
+        Returns:
+            Mapping of request name to query response
+        """
+        for request in requests.values():
+            self._reserve_query_width(request)
+        
+        misses = {}
+        for request in requests.values():
+            if self._cached_response(request) is None:
+                misses.setdefault(self._query_key(request), self._widest_request(request))
+        
+        if misses:
+            batch_requests = {f'q{i}': request for i, request in enumerate(misses.values())}
+            batch_responses = self._execute_batch(batch_requests)
+            for request_id, request in batch_requests.items():
+                self._store_response(request, batch_responses[request_id])
+        
+        return {name: self._cached_response(request) for name, request in requests.items()}
+    
+    def _execute_batch(self, requests: dict) -> dict:
+        """
+        Execute several query request bodies in one multipart batch request.
+        
+        Args:
+            requests: Mapping of request name to query request body
+            
+        Returns:
+            Mapping of request name to query response
+        """
+        # Only requests missing from the response cache are sent
+        responses = {}
+        for name, request in requests.items():
+            cached = self._cached_query_response(request)
+            if cached is not None:
+                responses[name] = cached
+        errors = {}
+        
+        def route_response(request_id, response, exception):
+            if exception is not None:
+                errors[request_id] = exception
+            else:
+                self._store_query_response(requests[request_id], response)
+                responses[request_id] = response
+        
+        names = [name for name in requests if name not in responses]
+        for i in range(0, len(names), BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=route_response)
+            for name in names[i:i + BATCH_SIZE]:
+                batch.add(
+                    self.service.searchanalytics().query(siteUrl=self.site_url, body=requests[name]),
+                    request_id=name
+                )
+            call_with_retry('gsc', batch.execute, http=self._thread_http())
+        
+        # Resend transient failures one by one and raise the first permanent one in request order
+        for name in names:
+            if name in errors:
+                if not classify_error(errors[name])[0]:
+                    raise errors[name]
+                responses[name] = self._execute_body(requests[name])
+        
+        return responses
+    
+    def iter_query_rows(self, start_date: str, end_date: str, dimensions: list = None,
+                        max_rows: Optional[int] = None, page_size: int = MAX_PAGE_SIZE) -> Iterator[dict]:
+        """
+        Yield query rows lazily, walking startRow until the data is exhausted.
+        
+        At most one page of rows is held in memory at a time, so page_size acts
+        as the memory ceiling for large exports.
+        
+        Args:
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+            dimensions: Dimensions to group by
+            max_rows: Stop after this many rows (default: all rows)
+            page_size: Rows per request, at most MAX_PAGE_SIZE
+        """
+        page_size = min(page_size, MAX_PAGE_SIZE)
+        start_row = 0
+        
+        while max_rows is None or start_row < max_rows:
+            row_limit = page_size if max_rows is None else min(page_size, max_rows - start_row)
+            # Pages bypass the query and response caches to keep memory and disk bounded
+            response = self._execute_query(
+                start_date, end_date,
+                dimensions=dimensions,
+                row_limit=row_limit,
+                start_row=start_row,
+                use_cache=False
+            )
+            rows = response.get('rows', [])
+            
+            yield from rows
+            
+            start_row += len(rows)
+            if len(rows) < row_limit:
+                break
+    
+    def export_query_rows(self, path, start_date: str, end_date: str, dimensions: list = None,
+                          max_rows: Optional[int] = None, page_size: int = MAX_PAGE_SIZE) -> int:
+        """
+        Stream query rows straight to a CSV file.
+        
+        Args:
+            path: Destination CSV file path
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+            dimensions: Dimensions to group by, written as leading columns
+            max_rows: Stop after this many rows (default: all rows)
+            page_size: Rows per request; bounds memory use
+            
+        Returns:
+            Number of rows written
+        """
+        dimensions = dimensions or []
+        count = 0
+        
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(dimensions + ['clicks', 'impressions', 'ctr', 'position'])
+            for row in self.iter_query_rows(start_date, end_date, dimensions, max_rows, page_size):
+                writer.writerow(row.get('keys', []) + [
+                    row.get('clicks', 0),
+                    row.get('impressions', 0),
+                    row.get('ctr', 0),
+                    row.get('position', 0),
+                ])
+                count += 1
+        
+        return count
+    
     def fetch_overview_metrics(self) -> dict:
         """
         Fetch key overview metrics comparing current week vs previous week.
         
+        Both periods are aggregated locally from one day-level query over the
+        span covering them, so the comparison period costs no extra query.
+        
         Returns:
             Dict with current and previous period data, plus calculated changes.
         """
-        current_range, previous_range = self._get_date_ranges()
+        current_range, compare_range, scale = self._get_overview_ranges()
         
-        # Fetch current period (no dimensions = aggregate data)
-        current_response = self._execute_query(
-            current_range[0], current_range[1], 
-            dimensions=[]
-        )
+        if self.warehouse is not None:
+            rows = self._warehouse_daily_rows([current_range, compare_range])
+        else:
+            rows = []
+            for span in covering_spans([current_range, compare_range]):
+                response = self._execute_cached(self._build_daily_query(*span))
+                rows.extend(self._process_daily_rows(response.get('rows', []), *span))
         
-        # Fetch previous period
-        previous_response = self._execute_query(
-            previous_range[0], previous_range[1],
-            dimensions=[]
+        return self._process_overview_days(rows, current_range, compare_range, scale)
+    
+    def _process_overview_days(self, rows, current_range, compare_range, scale: float) -> dict:
+        """Aggregate day-level rows into the overview for both periods."""
+        series = DailySeries(rows, GSC_DAILY_COLUMNS)
+        return self._process_overview_responses(
+            {'rows': [gsc_overview_row(series.totals(*current_range))]},
+            {'rows': [gsc_overview_row(series.totals(*compare_range, scale=scale))]},
+            current_range, compare_range
         )
-        
+    
+    def _process_overview_responses(self, current_response, previous_response,
+                                    current_range, previous_range) -> dict:
+        """Process overview responses for the current and previous periods."""
         # Extract metrics
         def extract_metrics(response):
             if 'rows' in response and response['rows']:
@@ -155,13 +526,60 @@ class GSCFetcher:
         return {
             'period': {
                 'current': {'start': current_range[0], 'end': current_range[1]},
-                'previous': {'start': previous_range[0], 'end': previous_range[1]}
+                'previous': {'start': previous_range[0], 'end': previous_range[1]},
+                'comparison': self.comparison
             },
             'current': current_metrics,
             'previous': previous_metrics,
             'changes': changes
         }
     
+    def _build_daily_query(self, start_date: str, end_date: str) -> dict:
+        """Build a query returning one row per day; any span fits in a single page."""
+        return self._build_query(start_date, end_date, dimensions=['date'], row_limit=MAX_PAGE_SIZE)
+    
+    def _process_daily_rows(self, rows, start_date: str, end_date: str) -> list[dict]:
+        """
+        Convert date-dimension rows to warehouse column form.
+        
+        Days without any data are returned as zero rows so they are stored
+        and not requested again.
+        """
+        days = {
+            date: {'date': date, **{column: 0.0 for column in GSC_DAILY_COLUMNS}}
+            for date in date_span(start_date, end_date)
+        }
+        for row in rows:
+            date = row['keys'][0]
+            impressions = row.get('impressions', 0)
+            days[date] = {
+                'date': date,
+                'clicks': row.get('clicks', 0),
+                'impressions': impressions,
+                'weighted_position': row.get('position', 0) * impressions,
+            }
+        return list(days.values())
+    
+    def fetch_daily_metrics(self, start_date: str, end_date: str) -> list[dict]:
+        """Fetch day-level additive metrics in warehouse column form."""
+        rows = self.iter_query_rows(start_date, end_date, dimensions=['date'])
+        return self._process_daily_rows(rows, start_date, end_date)
+    
+    def _sync_warehouse(self, start_date: str, end_date: str):
+        """Fetch the days in a range that the warehouse is missing or holds as not final."""
+        missing = self.warehouse.missing_dates('gsc_daily', self.site_url, start_date, end_date)
+        if missing:
+            rows = self.fetch_daily_metrics(missing[0], missing[-1])
+            self.warehouse.upsert_days('gsc_daily', self.site_url, rows, GSC_FINAL_AFTER_DAYS)
+    
+    def _warehouse_daily_rows(self, ranges: list) -> list[dict]:
+        """Sync the warehouse for the given ranges and return their stored days."""
+        rows = []
+        for span in covering_spans(ranges):
+            self._sync_warehouse(*span)
+            rows.extend(self.warehouse.daily_rows('gsc_daily', self.site_url, *span))
+        return rows
+    
     def fetch_top_queries(self, limit: int = 20) -> dict:
         """Fetch top search queries."""
         current_range, previous_range = self._get_date_ranges()
@@ -173,24 +591,79 @@ class GSCFetcher:
             row_limit=limit
         )
         
-        # Previous period queries for comparison
-        previous_response = self._execute_query(
-            previous_range[0], previous_range[1],
-            dimensions=['query'],
-            row_limit=100  # Get more to find matches
-        )
+        # Previous period metrics for exactly the current queries
+        previous_lookup = self._fetch_previous_query_lookup(current_response, previous_range)
         
-        # Build previous period lookup
+        return self._process_top_queries_response(current_response, previous_lookup, current_range)
+    
+    def _query_filter_groups(self, queries: list) -> list:
+        """
+        Split queries into dimension filter groups that match them exactly.
+        
+        Filter groups only support AND, so an OR over queries is expressed as one
+        anchored RE2 alternation per group, each kept under QUERY_FILTER_MAX_LENGTH.
+        """
+        groups = []
+        chunk = []
+        length = 0
+        for query in queries:
+            pattern = re.escape(query)
+            if chunk and length + len(pattern) + 1 > QUERY_FILTER_MAX_LENGTH:
+                groups.append(chunk)
+                chunk, length = [], 0
+            chunk.append(pattern)
+            length += len(pattern) + 1
+        if chunk:
+            groups.append(chunk)
+        
+        return [
+            (len(chunk), [{'filters': [{
+                'dimension': 'query',
+                'operator': 'includingRegex',
+                'expression': f"^(?:{'|'.join(chunk)})$",
+            }]}])
+            for chunk in groups
+        ]
+    
+    def _fetch_previous_query_lookup(self, current_response, previous_range) -> dict:
+        """
+        Fetch previous-period metrics for the queries in a current-period response.
+        
+        Returns:
+            Dict mapping query to its previous-period clicks, impressions and position
+        """
+        queries = [row['keys'][0] for row in current_response.get('rows', [])]
+        if not queries:
+            return {}
+        
+        requests = {
+            f'previous_{i}': self._build_query(
+                *previous_range,
+                dimensions=['query'],
+                row_limit=row_count,
+                dimension_filter_groups=filter_groups
+            )
+            for i, (row_count, filter_groups) in enumerate(self._query_filter_groups(queries))
+        }
+        
+        if len(requests) == 1:
+            responses = [self._execute_cached(next(iter(requests.values())))]
+        else:
+            responses = self._execute_cached_batch(requests).values()
+        
+        # Hash index of the previous period, joined against current queries
         previous_lookup = {}
-        if 'rows' in previous_response:
-            for row in previous_response['rows']:
-                query = row['keys'][0]
-                previous_lookup[query] = {
+        for response in responses:
+            for row in response.get('rows', []):
+                previous_lookup[row['keys'][0]] = {
                     'clicks': row.get('clicks', 0),
                     'impressions': row.get('impressions', 0),
                     'position': round(row.get('position', 0), 2)
                 }
-        
+        return previous_lookup
+    
+    def _process_top_queries_response(self, current_response, previous_lookup, current_range) -> dict:
+        """Process the top query response, comparing against previous-period metrics."""
         queries = []
         if 'rows' in current_response:
             for row in current_response['rows']:
@@ -228,6 +701,10 @@ class GSCFetcher:
             row_limit=limit
         )
         
+        return self._process_top_pages_response(response, current_range)
+    
+    def _process_top_pages_response(self, response, current_range) -> dict:
+        """Process top pages response."""
         pages = []
         if 'rows' in response:
             for row in response['rows']:
@@ -254,6 +731,10 @@ class GSCFetcher:
             row_limit=10
         )
         
+        return self._process_device_breakdown_response(response, current_range)
+    
+    def _process_device_breakdown_response(self, response, current_range) -> dict:
+        """Process device category breakdown response."""
         devices = []
         total_clicks = sum(row.get('clicks', 0) for row in response.get('rows', []))
         
@@ -284,6 +765,10 @@ class GSCFetcher:
             row_limit=limit
         )
         
+        return self._process_country_breakdown_response(response, current_range)
+    
+    def _process_country_breakdown_response(self, response, current_range) -> dict:
+        """Process country breakdown response."""
         countries = []
         total_clicks = sum(row.get('clicks', 0) for row in response.get('rows', []))
         
@@ -313,9 +798,13 @@ class GSCFetcher:
         response = self._execute_query(
             current_range[0], current_range[1],
             dimensions=['query'],
-            row_limit=100  # Get more to filter
+            row_limit=OPPORTUNITY_POOL_SIZE  # Get more to filter
         )
         
+        return self._process_query_opportunities_response(response, current_range, limit)
+    
+    def _process_query_opportunities_response(self, response, current_range, limit: int) -> dict:
+        """Filter a query response down to high-impression, low-CTR opportunities."""
         opportunities = []
         if 'rows' in response:
             # Filter for high impression, low CTR queries
@@ -344,10 +833,63 @@ class GSCFetcher:
             'opportunities': opportunities
         }
     
-    def fetch_all_data(self) -> dict:
+    def _fetch_all_batched(self) -> dict:
+        """Fetch every report section with a single batch request."""
+        current_range, previous_range = self._get_date_ranges()
+        _, compare_range, scale = self._get_overview_ranges()
+        
+        # Overview days for both periods ride in the same batch unless the warehouse has them
+        overview_spans = covering_spans([current_range, compare_range])
+        requests = {}
+        if self.warehouse is None:
+            for i, span in enumerate(overview_spans):
+                requests[f'overview_days_{i}'] = self._build_daily_query(*span)
+        
+        responses = self._execute_cached_batch({
+            **requests,
+            'queries_current': self._build_query(*current_range, dimensions=['query'], row_limit=20),
+            'pages': self._build_query(*current_range, dimensions=['page'], row_limit=15),
+            'devices': self._build_query(*current_range, dimensions=['device'], row_limit=10),
+            'countries': self._build_query(*current_range, dimensions=['country'], row_limit=10),
+            'opportunities': self._build_query(*current_range, dimensions=['query'], row_limit=OPPORTUNITY_POOL_SIZE),
+        })
+        
+        # The previous-period lookup depends on which queries are current
+        previous_lookup = self._fetch_previous_query_lookup(responses['queries_current'], previous_range)
+        
+        if self.warehouse is None:
+            overview_rows = []
+            for i, span in enumerate(overview_spans):
+                overview_rows.extend(
+                    self._process_daily_rows(responses[f'overview_days_{i}'].get('rows', []), *span)
+                )
+        else:
+            overview_rows = self._warehouse_daily_rows(overview_spans)
+        overview = self._process_overview_days(overview_rows, current_range, compare_range, scale)
+        
+        return {
+            'overview': overview,
+            'top_queries': self._process_top_queries_response(
+                responses['queries_current'], previous_lookup, current_range
+            ),
+            'top_pages': self._process_top_pages_response(responses['pages'], current_range),
+            'devices': self._process_device_breakdown_response(responses['devices'], current_range),
+            'countries': self._process_country_breakdown_response(responses['countries'], current_range),
+            'opportunities': self._process_query_opportunities_response(
+                responses['opportunities'], current_range, 10
+            ),
+        }
+    
+    def fetch_all_data(self, batch: bool = True, max_workers: int = None) -> dict:
         """
         Fetch all Search Console data for the weekly report.
         
+        Args:
+            batch: If True, send all queries in one multipart batch request
+                instead of one HTTP request per query
+            max_workers: Maximum concurrent API queries when batch is False
+                (default: FETCH_CONCURRENCY)
+        
         Returns:
             Complete GSC data dictionary with all metrics and dimensions.
         """
@@ -357,14 +899,26 @@ class GSCFetcher:
             'source': 'Google Search Console',
             'site_url': self.site_url,
             'fetched_at': datetime.now().isoformat(),
-            'overview': self.fetch_overview_metrics(),
-            'top_queries': self.fetch_top_queries(),
-            'top_pages': self.fetch_top_pages(),
-            'devices': self.fetch_device_breakdown(),
-            'countries': self.fetch_country_breakdown(),
-            'opportunities': self.fetch_query_opportunities(),
         }
         
+        if batch:
+            data.update(self._fetch_all_batched())
+        else:
+            # Top queries and opportunities share the current-period query set;
+            # reserve the wider width so it is fetched once
+            current_range, _ = self._get_date_ranges()
+            self._reserve_query_width(
+                self._build_query(*current_range, dimensions=['query'], row_limit=OPPORTUNITY_POOL_SIZE)
+            )
+            data.update(run_all_or_raise({
+                'overview': self.fetch_overview_metrics,
+                'top_queries': self.fetch_top_queries,
+                'top_pages': self.fetch_top_pages,
+                'devices': self.fetch_device_breakdown,
+                'countries': self.fetch_country_breakdown,
+                'opportunities': self.fetch_query_opportunities,
+            }, max_workers))
+        
         print("✅ Search Console data fetched successfully!")
         return data
 
@@ -372,7 +926,8 @@ class GSCFetcher:
 def test_connection() -> bool:
     """Test Search Console API connection."""
     try:
-        fetcher = GSCFetcher()
+        # Bypass the response cache so the test really reaches the API
+        fetcher = GSCFetcher(use_cache=False)
         # Just try to fetch basic data
         fetcher.fetch_overview_metrics()
         return True
@@ -383,7 +938,6 @@ def test_connection() -> bool:
 
 if __name__ == '__main__':
     # Test the fetcher
-    import json
     fetcher = GSCFetcher()
     data = fetcher.fetch_all_data()
     print(json.dumps(data, indent=2, ensure_ascii=False))
@@ -7,14 +7,29 @@ Orchestrates the weekly website analytics report generation.
 import argparse
 import json
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 # Add project root to path
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from src.config import validate_config, print_config_status
+from src.aggregation import COMPARISON_MODES
+from src.checkpoint import RunCheckpoint, new_run_id, prune_checkpoints
+from src.concurrency import api_slot, create_api_limits, run_concurrently
+from src.config import (
+    API_CONCURRENCY,
+    GEMINI_CONTEXT_CACHE,
+    SITE_CONCURRENCY,
+    validate_config,
+    print_config_status,
+)
+from src.quota import all_schedulers
+from src.retry import retries_left
+from src.sites import load_sites_manifest
+from src.warehouse import Warehouse
 from src.fetchers.ga4_fetcher import GA4Fetcher, test_connection as test_ga4
 from src.fetchers.gsc_fetcher import GSCFetcher, test_connection as test_gsc
 from src.analyzers.gemini_analyzer import GeminiAnalyzer, test_connection as test_gemini
@@ -55,7 +70,12 @@ def test_connections():
     return all_passed
 
 
-def run_report(dry_run: bool = False, save_data: bool = False, date_range: dict = None):
+def run_report(dry_run: bool = False, save_data: bool = False, date_range: dict = None,
+               parallel: bool = True, batch: bool = True, max_workers: int = None, use_cache: bool = None,
+               use_warehouse: bool = False, comparison: str = 'previous', use_llm_cache: bool = None,
+               use_context_cache: bool = None, stream: bool = False, sectional: bool = False,
+               site: dict = None, api_limits: dict = None, run_id: str = None,
+               resume: bool = False):
     """
     Run the complete weekly report generation.
     
@@ -63,9 +83,34 @@ def run_report(dry_run: bool = False, save_data: bool = False, date_range: dict
         dry_run: If True, only fetch data without publishing
         save_data: If True, save raw data to JSON files
         date_range: Optional dict with 'start' and 'end' keys for custom date range
+        parallel: If True, fetch GA4 and Search Console data concurrently
+        batch: If True, send each data source's requests as batch requests
+            (batchRunReports / multipart batch); if False, one request per section
+        max_workers: Maximum concurrent API requests per fetcher when batch is False
+            (default: FETCH_CONCURRENCY)
+        use_cache: Serve repeated API requests from the on-disk response cache
+            (default: RESPONSE_CACHE_ENABLED)
+        use_warehouse: If True, aggregate overviews from the local day-level warehouse
+            (WAREHOUSE_PATH), fetching only missing or not-yet-final days
+        comparison: Overview comparison period ('previous', 'yoy' or 'rolling-4-week')
+        use_llm_cache: Serve identical prompts from the on-disk Gemini response cache
+            (default: LLM_CACHE_ENABLED)
+        use_context_cache: Register the static prompt preamble once through the Gemini
+            cached-content API (default: GEMINI_CONTEXT_CACHE == '1')
+        stream: If True, stream the analysis as it is generated; dry runs render it
+            live and Notion blocks are converted while generation is still running
+        sectional: If True, generate each report section with its own prompt concurrently
+            and assemble them in order (not streamed)
+        site: Optional site from a sites manifest; overrides the configured GA4 property,
+            Search Console site and Notion parent page, and skips configuration validation
+        api_limits: Optional per-API semaphores shared with other sites' runs
+        run_id: Run whose stage checkpoints are written (default: a new run ID)
+        resume: If True, reuse the completed stages of run_id instead of redoing them
     """
     print("\n" + "=" * 60)
     print("📊 Website Weekly Analytics Report Generator")
+    if site:
+        print(f"🌐 Site: {site['name']}")
     print("=" * 60)
     print(f"⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
@@ -74,40 +119,96 @@ def run_report(dry_run: bool = False, save_data: bool = False, date_range: dict
         print(f"📅 Analysis period: {date_range['start']} to {date_range['end']}")
     else:
         print("📅 Analysis period: Last 7 days (default)")
-    print()
     
-    # Step 1: Validate configuration
-    print("Step 1: Validating configuration...")
-    if not print_config_status():
-        print("\n❌ Configuration validation failed. Please check your .env file.")
-        return False
+    # Every stage's output is checkpointed so a failed run can be resumed
+    checkpoint = RunCheckpoint(run_id, site=site['name'] if site else None)
+    if resume:
+        if checkpoint.exists():
+            print(f"⏭️  Resuming run {checkpoint.run_id}, completed: {', '.join(checkpoint.completed())}")
+        else:
+            print(f"⚠️  No checkpoints found for run {checkpoint.run_id}, starting from scratch")
+    print(f"🧾 Run ID: {checkpoint.run_id} (resume with --resume {checkpoint.run_id})")
     print()
     
-    # Step 2: Fetch GA4 data
-    print("Step 2: Fetching GA4 data...")
-    try:
-        ga4_fetcher = GA4Fetcher(date_range=date_range)
-        ga4_data = ga4_fetcher.fetch_all_data()
-    except Exception as e:
-        print(f"❌ Failed to fetch GA4 data: {e}")
-        return False
-    print()
+    # Step 1: Validate configuration (the multi-site runner validates once up front)
+    if site is None:
+        print("Step 1: Validating configuration...")
+        if not print_config_status():
+            print("\n❌ Configuration validation failed. Please check your .env file.")
+            return False
+        print()
     
-    # Step 3: Fetch Search Console data
-    print("Step 3: Fetching Search Console data...")
-    try:
-        gsc_fetcher = GSCFetcher(date_range=date_range)
-        gsc_data = gsc_fetcher.fetch_all_data()
-    except Exception as e:
-        print(f"❌ Failed to fetch Search Console data: {e}")
-        return False
-    print()
+    # Step 2 & 3: Fetch GA4 and Search Console data
+    fetcher_options = {
+        'date_range': date_range,
+        'use_cache': use_cache,
+        'warehouse': Warehouse() if use_warehouse else None,
+        'comparison': comparison,
+    }
+    ga4_options = dict(fetcher_options, property_id=site['ga4_property_id'] if site else None)
+    gsc_options = dict(fetcher_options, site_url=site['gsc_site_url'] if site else None)
+    
+    def fetch_ga4():
+        with api_slot(api_limits, 'ga4'):
+            data = GA4Fetcher(**ga4_options).fetch_all_data(batch=batch, max_workers=max_workers)
+        checkpoint.save('ga4_data', data)
+        return data
+    
+    def fetch_gsc():
+        with api_slot(api_limits, 'gsc'):
+            data = GSCFetcher(**gsc_options).fetch_all_data(batch=batch, max_workers=max_workers)
+        checkpoint.save('gsc_data', data)
+        return data
+    
+    ga4_data = checkpoint.load('ga4_data') if resume else None
+    gsc_data = checkpoint.load('gsc_data') if resume else None
+    
+    if ga4_data is not None and gsc_data is not None:
+        print("Step 2-3: ⏭️  Using checkpointed GA4 and Search Console data")
+        print()
+    elif parallel:
+        print("Step 2-3: Fetching GA4 and Search Console data concurrently...")
+        tasks = {}
+        if ga4_data is None:
+            tasks['ga4'] = fetch_ga4
+        if gsc_data is None:
+            tasks['gsc'] = fetch_gsc
+        results, errors = run_concurrently(tasks, max_workers=2)
+        if 'ga4' in errors:
+            print(f"❌ Failed to fetch GA4 data: {errors['ga4']}")
+        if 'gsc' in errors:
+            print(f"❌ Failed to fetch Search Console data: {errors['gsc']}")
+        if errors:
+            return False
+        ga4_data = results.get('ga4', ga4_data)
+        gsc_data = results.get('gsc', gsc_data)
+        print()
+    else:
+        if ga4_data is None:
+            print("Step 2: Fetching GA4 data...")
+            try:
+                ga4_data = fetch_ga4()
+            except Exception as e:
+                print(f"❌ Failed to fetch GA4 data: {e}")
+                return False
+            print()
+        
+        if gsc_data is None:
+            print("Step 3: Fetching Search Console data...")
+            try:
+                gsc_data = fetch_gsc()
+            except Exception as e:
+                print(f"❌ Failed to fetch Search Console data: {e}")
+                return False
+            print()
     
     # Save raw data if requested
     if save_data:
         data_dir = PROJECT_ROOT / 'data'
         data_dir.mkdir(exist_ok=True)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if site:
+            timestamp = f"{site['name']}_{timestamp}"
         
         with open(data_dir / f'ga4_data_{timestamp}.json', 'w', encoding='utf-8') as f:
             json.dump(ga4_data, f, indent=2, ensure_ascii=False)
@@ -119,15 +220,50 @@ def run_report(dry_run: bool = False, save_data: bool = False, date_range: dict
         print()
     
     # Step 4: Generate analysis with Gemini
-    print("Step 4: Generating AI analysis...")
-    try:
-        analyzer = GeminiAnalyzer()
-        analysis = analyzer.analyze(ga4_data, gsc_data)
-    except Exception as e:
-        print(f"❌ Failed to generate analysis: {e}")
-        return False
+    analysis = checkpoint.load('analysis') if resume else None
+    blocks = None
+    rendered = False
+    if analysis is not None:
+        print("Step 4: ⏭️  Using checkpointed AI analysis")
+    else:
+        print("Step 4: Generating AI analysis...")
+        try:
+            analyzer = GeminiAnalyzer(use_cache=use_llm_cache, use_context_cache=use_context_cache)
+            prompt = checkpoint.load('prompt') if resume else None
+            if prompt is None and not sectional:
+                prompt = analyzer.build_prompt(ga4_data, gsc_data)
+                checkpoint.save('prompt', prompt)
+            if sectional:
+                # Each section call takes its own Gemini slot, so the shared limit still holds
+                analysis = analyzer.analyze_sections(ga4_data, gsc_data, slot=api_slot(api_limits, 'gemini'))
+            else:
+                with api_slot(api_limits, 'gemini'):
+                    if stream:
+                        if dry_run:
+                            print("🔍 DRY RUN MODE - Live report:")
+                            print("-" * 40)
+                        convert = None if dry_run else NotionPublisher(
+                            parent_page_id=site['notion_parent_page_id'] if site else None
+                        ).iter_notion_blocks
+                        analysis, blocks = collect_stream(
+                            analyzer.analyze_stream(ga4_data, gsc_data, prompt=prompt),
+                            echo=dry_run, convert=convert
+                        )
+                        if dry_run:
+                            print("-" * 40)
+                            rendered = True
+                    else:
+                        analysis = analyzer.analyze(ga4_data, gsc_data, prompt=prompt)
+            checkpoint.save('analysis', analysis)
+        except Exception as e:
+            print(f"❌ Failed to generate analysis: {e}")
+            return False
     print()
     
+    if dry_run and rendered:
+        print("\n✅ Dry run completed. Report NOT published to Notion.")
+        return True
+    
     if dry_run:
         print("🔍 DRY RUN MODE - Report preview:")
         print("-" * 40)
@@ -139,16 +275,28 @@ def run_report(dry_run: bool = False, save_data: bool = False, date_range: dict
         return True
     
     # Step 5: Publish to Notion
-    print("Step 5: Publishing to Notion...")
-    try:
-        publisher = NotionPublisher()
-        period = ga4_data.get('overview', {}).get('period', {}).get('current', {})
-        week_start = period.get('start', '')
-        week_end = period.get('end', '')
-        result = publisher.publish_weekly_report(analysis, week_start, week_end)
-    except Exception as e:
-        print(f"❌ Failed to publish to Notion: {e}")
-        return False
+    result = checkpoint.load('notion_page') if resume else None
+    if result is not None:
+        print("Step 5: ⏭️  Report was already published to Notion")
+    else:
+        print("Step 5: Publishing to Notion...")
+        try:
+            publisher = NotionPublisher(parent_page_id=site['notion_parent_page_id'] if site else None)
+            period = ga4_data.get('overview', {}).get('period', {}).get('current', {})
+            week_start = period.get('start', '')
+            week_end = period.get('end', '')
+            # The page ID is checkpointed once created, so --resume finishes this page
+            # instead of creating a second one
+            draft = checkpoint.load('notion_draft') if resume else None
+            with api_slot(api_limits, 'notion'):
+                result = publisher.publish_weekly_report(
+                    analysis, week_start, week_end, blocks=blocks, page=draft,
+                    on_progress=lambda progress: checkpoint.save('notion_draft', progress)
+                )
+            checkpoint.save('notion_page', result)
+        except Exception as e:
+            print(f"❌ Failed to publish to Notion: {e}")
+            return False
     print()
     
     # Done!
@@ -161,6 +309,115 @@ def run_report(dry_run: bool = False, save_data: bool = False, date_range: dict
     return True
 
 
+def collect_stream(chunks, echo: bool = False, convert=None) -> tuple[str, Optional[list]]:
+    """
+    Consume a streamed analysis.
+    
+    Args:
+        chunks: Markdown chunks from GeminiAnalyzer.analyze_stream()
+        echo: If True, print each chunk as soon as it arrives
+        convert: Optional callable turning an iterable of chunks into Notion blocks;
+            it consumes the stream, so conversion overlaps generation
+            
+    Returns:
+        Tuple of (full analysis markdown, converted blocks or None)
+    """
+    parts = []
+    
+    def tee():
+        for chunk in chunks:
+            parts.append(chunk)
+            if echo:
+                print(chunk, end='', flush=True)
+            yield chunk
+    
+    if convert is not None:
+        blocks = list(convert(tee()))
+    else:
+        blocks = None
+        for _ in tee():
+            pass
+    if echo:
+        print()
+    return ''.join(parts), blocks
+
+
+def run_sites(sites: list[dict], site_concurrency: int = None, **report_options) -> bool:
+    """
+    Run the weekly report for every site in a manifest.
+    
+    Sites run concurrently, while calls to each upstream API (GA4, Search Console,
+    Gemini, Notion) are bounded by API_CONCURRENCY across all sites. A failing
+    site does not stop the others.
+    
+    Args:
+        sites: Sites loaded with load_sites_manifest()
+        site_concurrency: Maximum sites processed at once (default: SITE_CONCURRENCY)
+        **report_options: Passed through to run_report()
+        
+    Returns:
+        True if every site succeeded
+    """
+    print("\n" + "=" * 60)
+    print(f"🌐 Multi-site run: {len(sites)} sites")
+    print("=" * 60)
+    
+    if not print_config_status(require_site=False):
+        print("\n❌ Configuration validation failed. Please check your .env file.")
+        return False
+    
+    # All sites share one run ID so a --resume covers the whole manifest
+    if report_options.get('run_id') is None:
+        report_options['run_id'] = new_run_id()
+    print(f"🧾 Run ID: {report_options['run_id']}")
+    
+    # Concurrent sites would interleave live output, so each collects its analysis whole
+    report_options['stream'] = False
+    
+    # Sites share one registered prompt preamble instead of each resending it
+    if report_options.get('use_context_cache') is None:
+        report_options['use_context_cache'] = GEMINI_CONTEXT_CACHE != '0'
+    
+    api_limits = create_api_limits(API_CONCURRENCY)
+    durations = {}
+    started_at = time.monotonic()
+    
+    def run_site(site):
+        site_started_at = time.monotonic()
+        try:
+            return run_report(site=site, api_limits=api_limits, **report_options)
+        finally:
+            durations[site['name']] = time.monotonic() - site_started_at
+    
+    results, errors = run_concurrently(
+        {site['name']: lambda site=site: run_site(site) for site in sites},
+        max_workers=site_concurrency or SITE_CONCURRENCY
+    )
+    
+    # Summary
+    succeeded = [name for name, ok in results.items() if ok]
+    print("\n" + "=" * 60)
+    print("📋 Multi-site summary")
+    print("=" * 60)
+    for site in sites:
+        name = site['name']
+        if name in succeeded:
+            print(f"✅ {name} ({durations[name]:.1f}s)")
+        elif name in errors:
+            print(f"❌ {name} ({durations[name]:.1f}s): {errors[name]}")
+        else:
+            print(f"❌ {name} ({durations[name]:.1f}s): see log above")
+    print("-" * 60)
+    for scheduler in all_schedulers():
+        print(f"📉 GA4 quota {scheduler.describe()}")
+    print(f"🔁 Retries left: {', '.join(f'{api} {left}' for api, left in retries_left().items())}")
+    print("-" * 60)
+    print(f"{len(succeeded)}/{len(sites)} sites succeeded in {time.monotonic() - started_at:.1f}s")
+    print("=" * 60)
+    
+    return len(succeeded) == len(sites)
+
+
 def main():
     """Main entry point with argument parsing."""
     parser = argparse.ArgumentParser(
@@ -174,6 +431,8 @@ Examples:
   python src/main.py --save-data        # Save raw data to JSON
   python src/main.py --period last-month # Analyze last month
   python src/main.py --start-date 2024-12-01 --end-date 2024-12-15  # Custom range
+  python src/main.py --sites sites.json # Run every site in a manifest
+  python src/main.py --resume 20241216-090000-1a2b  # Resume a failed run
         """
     )
     
@@ -201,6 +460,81 @@ Examples:
         help='Check configuration status and exit'
     )
     
+    parser.add_argument(
+        '--sequential',
+        action='store_true',
+        help='Fetch GA4 and Search Console one after the other, one request at a time'
+    )
+    
+    parser.add_argument(
+        '--no-batch',
+        action='store_true',
+        help='Send one API request per report section instead of batch requests'
+    )
+    
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        help='Maximum concurrent API requests per data source with --no-batch (default: FETCH_CONCURRENCY)'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Ignore the on-disk API response cache and fetch fresh data'
+    )
+    
+    parser.add_argument(
+        '--no-llm-cache',
+        action='store_true',
+        help='Ignore the Gemini response cache and always generate a new analysis'
+    )
+    
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Stream the analysis as it is generated: --dry-run shows it live, Notion blocks are built as it arrives'
+    )
+    
+    parser.add_argument(
+        '--sectional',
+        action='store_true',
+        help='Generate the report sections concurrently, each from its own focused prompt'
+    )
+    
+    parser.add_argument(
+        '--warehouse',
+        action='store_true',
+        help='Aggregate overview metrics from the local day-level warehouse'
+    )
+    
+    parser.add_argument(
+        '--sites',
+        type=str,
+        metavar='MANIFEST',
+        help='Run the report for every site in a JSON/YAML sites manifest'
+    )
+    
+    parser.add_argument(
+        '--site-concurrency',
+        type=int,
+        help='Maximum sites processed at once with --sites (default: SITE_CONCURRENCY)'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        type=str,
+        metavar='RUN_ID',
+        help='Resume a run, skipping stages it already completed'
+    )
+    
+    parser.add_argument(
+        '--compare',
+        choices=COMPARISON_MODES,
+        default='previous',
+        help='Overview comparison period (default: previous)'
+    )
+    
     # Date range arguments
     parser.add_argument(
         '--start-date',
@@ -234,11 +568,37 @@ Examples:
     # Parse date range
     date_range = parse_date_range(args.start_date, args.end_date, args.period)
     
-    success = run_report(
-        dry_run=args.dry_run, 
-        save_data=args.save_data,
-        date_range=date_range
-    )
+    report_options = {
+        'dry_run': args.dry_run,
+        'save_data': args.save_data,
+        'date_range': date_range,
+        'parallel': not args.sequential,
+        'batch': not args.no_batch,
+        'max_workers': 1 if args.sequential else args.concurrency,
+        'use_cache': False if args.no_cache else None,
+        'use_llm_cache': False if args.no_llm_cache else None,
+        'use_warehouse': args.warehouse,
+        'stream': args.stream,
+        'sectional': args.sectional,
+        'comparison': args.compare,
+        'run_id': args.resume,
+        'resume': args.resume is not None,
+    }
+    
+    # Drop checkpoints of published or long-abandoned runs before adding new ones
+    manifests_removed, _ = prune_checkpoints(keep_run=args.resume)
+    if manifests_removed:
+        print(f"🧹 Pruned {manifests_removed} old run checkpoints")
+    
+    if args.sites:
+        try:
+            sites = load_sites_manifest(args.sites)
+        except (OSError, ValueError) as e:
+            print(f"❌ Failed to load sites manifest: {e}")
+            sys.exit(1)
+        success = run_sites(sites, site_concurrency=args.site_concurrency, **report_options)
+    else:
+        success = run_report(**report_options)
     sys.exit(0 if success else 1)
 
 
@@ -4,10 +4,11 @@ Publishes analysis reports to Notion as new pages.
 """
 
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional
 from notion_client import Client
 
 from src.config import NOTION_TOKEN, NOTION_PARENT_PAGE_ID
+from src.retry import call_with_retry, classify_rejected_error
 
 
 class NotionPublisher:
@@ -135,6 +136,22 @@ class NotionPublisher:
         
         return blocks
     
+    def iter_notion_blocks(self, chunks: Iterable[str]) -> Iterator[dict]:
+        """
+        Convert streamed markdown chunks to Notion blocks as they arrive.
+        
+        No block spans a blank line, so everything before the last blank line
+        received so far is converted while the rest is still being generated.
+        """
+        buffer = ''
+        for chunk in chunks:
+            buffer += chunk
+            cut = buffer.rfind('\n\n')
+            if cut >= 0:
+                yield from self._markdown_to_notion_blocks(buffer[:cut])
+                buffer = buffer[cut + 2:]
+        yield from self._markdown_to_notion_blocks(buffer)
+    
     def _parse_inline_formatting(self, text: str) -> list:
         """Parse inline markdown formatting (bold, italic, etc.)."""
         # Simplified: just return as plain text
@@ -146,14 +163,24 @@ class NotionPublisher:
         
         return [{'type': 'text', 'text': {'content': text}}]
     
-    def publish(self, title: str, content: str, icon: str = "📊") -> dict:
+    def publish(self, title: str, content: str, icon: str = "📊", blocks: list = None,
+                page: dict = None, on_progress: Callable[[dict], None] = None) -> dict:
         """
         Publish a report to Notion as a new page.
         
+        Creating the page and appending blocks are not idempotent, so they are
+        only retried when Notion rejected the request. If an append fails for
+        good, pass the last progress reported to on_progress back as page to
+        finish the same page instead of creating another one.
+        
         Args:
             title: Page title
             content: Markdown content of the report
             icon: Emoji icon for the page
+            blocks: Blocks already converted from content, e.g. by iter_notion_blocks()
+            page: Progress of an earlier, unfinished publish of this report (optional)
+            on_progress: Called with the progress (page_id, url, blocks_published)
+                after the page is created and after each append
             
         Returns:
             Dict with page ID and URL
@@ -161,41 +188,56 @@ class NotionPublisher:
         print("📝 Publishing report to Notion...")
         
         # Convert markdown to Notion blocks
-        blocks = self._markdown_to_notion_blocks(content)
+        if blocks is None:
+            blocks = self._markdown_to_notion_blocks(content)
         
-        # Split blocks into chunks (Notion API limit: 100 blocks per request)
-        block_chunks = [blocks[i:i+100] for i in range(0, len(blocks), 100)]
-        
-        # Create the page with first chunk
-        page = self.client.pages.create(
-            parent={'page_id': self.parent_page_id},
-            icon={'type': 'emoji', 'emoji': icon},
-            properties={
-                'title': {
-                    'title': [{'type': 'text', 'text': {'content': title}}]
-                }
-            },
-            children=block_chunks[0] if block_chunks else []
-        )
-        
-        page_id = page['id']
+        if page is None:
+            # Create the page with first chunk (Notion API limit: 100 blocks per request)
+            created = call_with_retry(
+                'notion',
+                self.client.pages.create,
+                classify=classify_rejected_error,
+                parent={'page_id': self.parent_page_id},
+                icon={'type': 'emoji', 'emoji': icon},
+                properties={
+                    'title': {
+                        'title': [{'type': 'text', 'text': {'content': title}}]
+                    }
+                },
+                children=blocks[:100]
+            )
+            page_id = created['id']
+            page = {
+                'page_id': page_id,
+                'url': created.get('url', f"https://notion.so/{page_id.replace('-', '')}"),
+                'blocks_published': min(len(blocks), 100),
+            }
+            if on_progress:
+                on_progress(dict(page))
+        else:
+            print(f"⏭️  Continuing page {page['url']} after {page['blocks_published']} blocks")
+            page = dict(page)
         
         # Append remaining blocks if any
-        for chunk in block_chunks[1:]:
-            self.client.blocks.children.append(block_id=page_id, children=chunk)
-        
-        # Get page URL
-        page_url = page.get('url', f"https://notion.so/{page_id.replace('-', '')}")
+        for start in range(page['blocks_published'], len(blocks), 100):
+            chunk = blocks[start:start + 100]
+            call_with_retry('notion', self.client.blocks.children.append, classify=classify_rejected_error,
+                            block_id=page['page_id'], children=chunk)
+            page['blocks_published'] = start + len(chunk)
+            if on_progress:
+                on_progress(dict(page))
         
         print(f"✅ Report published successfully!")
-        print(f"   URL: {page_url}")
+        print(f"   URL: {page['url']}")
         
         return {
-            'page_id': page_id,
-            'url': page_url
+            'page_id': page['page_id'],
+            'url': page['url']
         }
     
-    def publish_weekly_report(self, content: str, week_start: str = None, week_end: str = None) -> dict:
+    def publish_weekly_report(self, content: str, week_start: str = None, week_end: str = None,
+                              blocks: list = None, page: dict = None,
+                              on_progress: Callable[[dict], None] = None) -> dict:
         """
         Publish a weekly analytics report.
         
@@ -203,6 +245,9 @@ class NotionPublisher:
             content: Markdown content of the report
             week_start: Start date of the period
             week_end: End date of the period (optional)
+            blocks: Blocks already converted from content (optional)
+            page: Progress of an earlier, unfinished publish (optional)
+            on_progress: Called with the publish progress, see publish()
             
         Returns:
             Dict with page ID and URL
@@ -216,7 +261,7 @@ class NotionPublisher:
         else:
             title = f"网站周报分析 - {week_start}"
         
-        return self.publish(title, content, icon="📈")
+        return self.publish(title, content, icon="📈", blocks=blocks, page=page, on_progress=on_progress)
 
 
 def test_connection() -> bool:
@@ -0,0 +1,264 @@
+"""
+GA4 Quota Scheduler Module.
+Tracks the property quota reported on Data API responses and paces requests to stay within it.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+
+from src.config import GA4_CONCURRENT_REQUESTS, GA4_QUOTA_MAX_WAIT, GA4_QUOTA_RESERVE_TOKENS
+from src.retry import exhausted_quota
+
+# PropertyQuota fields tracked from responses
+QUOTA_FIELDS = (
+    'tokens_per_day',
+    'tokens_per_hour',
+    'concurrent_requests',
+    'server_errors_per_project_per_hour',
+    'potentially_thresholded_requests_per_hour',
+    'tokens_per_project_per_hour',
+)
+
+# Tokens assumed for a request shape whose cost has not been observed yet
+DEFAULT_REQUEST_COST = 10
+
+_lock = threading.Lock()
+
+# Property ID -> scheduler shared by every fetcher of that property
+_schedulers = {}
+
+# Request shape -> tokens last charged for it; cost depends on the shape, not the property
+_request_costs = {}
+
+
+class QuotaExhaustedError(RuntimeError):
+    """Raised when a property's quota cannot cover a request within the allowed wait."""
+
+
+def request_shape(request) -> tuple:
+    """Key a report request by its dimensions and metrics, which drive its token cost."""
+    return (
+        tuple(dimension.name for dimension in request.dimensions),
+        tuple(metric.name for metric in request.metrics),
+    )
+
+
+def estimate_cost(request) -> int:
+    """Estimate the tokens a report request will consume from earlier requests of the same shape."""
+    with _lock:
+        return _request_costs.get(request_shape(request), DEFAULT_REQUEST_COST)
+
+
+class QuotaScheduler:
+    """
+    Paces one GA4 property's requests using the quota reported on its responses.
+
+    Every request holds one of GA4_CONCURRENT_REQUESTS slots and reserves its
+    estimated token cost. When the hourly tokens left would fall below
+    reserve_tokens the request waits for the next hour; when the daily tokens
+    are used up, or the wait exceeds max_wait, QuotaExhaustedError is raised
+    instead of letting the API fail with RESOURCE_EXHAUSTED.
+    """
+
+    def __init__(self, property_id: str, reserve_tokens: int = None, max_wait: float = None,
+                 concurrent_requests: int = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            property_id: GA4 property (format: properties/XXXXXXXXX)
+            reserve_tokens: Hourly tokens kept unused (default: GA4_QUOTA_RESERVE_TOKENS)
+            max_wait: Longest wait in seconds for the hourly quota to refresh
+                (default: GA4_QUOTA_MAX_WAIT)
+            concurrent_requests: Requests in flight at once (default: GA4_CONCURRENT_REQUESTS)
+        """
+        self.property_id = property_id
+        self.reserve_tokens = GA4_QUOTA_RESERVE_TOKENS if reserve_tokens is None else reserve_tokens
+        self.max_wait = GA4_QUOTA_MAX_WAIT if max_wait is None else max_wait
+        self.status = {}
+        self.tokens_used = 0
+        self.requests = 0
+        self._observed_at = None
+        self._reserved = 0
+        self._lock = threading.Lock()
+        self.concurrent_requests = max(1, concurrent_requests or GA4_CONCURRENT_REQUESTS)
+        self._slots = threading.BoundedSemaphore(self.concurrent_requests)
+        # asyncio semaphores belong to one event loop, so aslot() keeps one per loop
+        self._async_slots = weakref.WeakKeyDictionary()
+
+    def record(self, request, property_quota):
+        """Update the quota status from a response's property_quota, if it has one."""
+        if not property_quota:
+            return
+
+        status = {}
+        for field in QUOTA_FIELDS:
+            quota = getattr(property_quota, field)
+            if quota:
+                status[field] = {'consumed': quota.consumed, 'remaining': quota.remaining}
+
+        cost = status.get('tokens_per_hour', {}).get('consumed')
+        with self._lock:
+            self.status = status
+            self._observed_at = datetime.now()
+            self.requests += 1
+            self.tokens_used += cost or 0
+        if cost:
+            with _lock:
+                _request_costs[request_shape(request)] = cost
+
+    def record_exhausted(self, error: Exception):
+        """
+        Mark a quota as used up when a request failed with RESOURCE_EXHAUSTED.
+
+        Daily exhaustion makes later requests raise QuotaExhaustedError; any
+        hourly quota makes them wait for the next hour like a low token budget.
+        """
+        field = exhausted_quota(error)
+        if field is None:
+            return
+        field = 'tokens_per_day' if field == 'tokens_per_day' else 'tokens_per_hour'
+        with self._lock:
+            self.status[field] = {'consumed': self.status.get(field, {}).get('consumed'), 'remaining': 0}
+            self._observed_at = datetime.now()
+
+    def _remaining(self, field: str) -> Optional[int]:
+        """Get the remaining quota of a field, or None if it is unknown or has refreshed."""
+        if field not in self.status:
+            return None
+        # Hourly quotas refresh on the hour; treat an earlier hour's status as unknown
+        if field == 'tokens_per_hour':
+            if self._observed_at.replace(minute=0, second=0, microsecond=0) != \
+                    datetime.now().replace(minute=0, second=0, microsecond=0):
+                return None
+        return self.status[field]['remaining']
+
+    def _try_reserve(self, cost: int) -> float:
+        """
+        Reserve cost tokens if the budget allows it.
+
+        Returns:
+            0 once reserved, otherwise the seconds to wait before trying again
+        """
+        with self._lock:
+            daily = self._remaining('tokens_per_day')
+            if daily is not None and daily - self._reserved < cost:
+                raise QuotaExhaustedError(
+                    f"GA4 daily token quota exhausted for {self.property_id} "
+                    f"({daily} tokens left, ~{cost} needed)"
+                )
+
+            hourly = self._remaining('tokens_per_hour')
+            if hourly is None or hourly - self._reserved - cost >= self.reserve_tokens:
+                self._reserved += cost
+                return 0
+
+        next_hour = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        return (next_hour - datetime.now()).total_seconds() + 1
+
+    def _check_wait(self, delay: float, waited: float):
+        """Raise if waiting delay more seconds would exceed max_wait."""
+        if waited + delay > self.max_wait:
+            raise QuotaExhaustedError(
+                f"GA4 hourly token quota low for {self.property_id}: "
+                f"{self._remaining('tokens_per_hour')} tokens left, refresh in {delay:.0f}s"
+            )
+        print(f"⏳ GA4 hourly quota low for {self.property_id}, waiting {delay:.0f}s for it to refresh...")
+
+    def _release(self, cost: int):
+        with self._lock:
+            self._reserved -= cost
+
+    @contextmanager
+    def slot(self, cost: int = DEFAULT_REQUEST_COST):
+        """Hold a concurrent request slot and cost tokens of budget while a request runs."""
+        with self._slots:
+            waited = 0.0
+            while (delay := self._try_reserve(cost)) > 0:
+                self._check_wait(delay, waited)
+                time.sleep(delay)
+                waited += delay
+            try:
+                yield
+            except Exception as e:
+                self.record_exhausted(e)
+                raise
+            finally:
+                self._release(cost)
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        """Get the running event loop's concurrent request semaphore."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._async_slots.get(loop)
+            if semaphore is None:
+                semaphore = self._async_slots[loop] = asyncio.Semaphore(self.concurrent_requests)
+        return semaphore
+
+    @asynccontextmanager
+    async def aslot(self, cost: int = DEFAULT_REQUEST_COST):
+        """Hold a concurrent request slot and cost tokens of budget while a request runs on the event loop."""
+        async with self._async_semaphore():
+            waited = 0.0
+            while (delay := self._try_reserve(cost)) > 0:
+                self._check_wait(delay, waited)
+                await asyncio.sleep(delay)
+                waited += delay
+            try:
+                yield
+            except Exception as e:
+                self.record_exhausted(e)
+                raise
+            finally:
+                self._release(cost)
+
+    def order(self, requests: list) -> list:
+        """
+        Order request indexes cheapest first.
+
+        When the hourly budget runs low, the cheap sections still complete
+        before the run starts waiting for the quota to refresh.
+        """
+        return sorted(range(len(requests)), key=lambda i: estimate_cost(requests[i]))
+
+    def snapshot(self) -> dict:
+        """Get the latest quota status and this process's usage for run output."""
+        with self._lock:
+            return {
+                'property_id': self.property_id,
+                'requests': self.requests,
+                'tokens_used': self.tokens_used,
+                'remaining': {field: quota['remaining'] for field, quota in self.status.items()},
+            }
+
+    def describe(self) -> str:
+        """Summarize the remaining budget in one line."""
+        snapshot = self.snapshot()
+        remaining = snapshot['remaining']
+        if not remaining:
+            return f"{self.property_id}: no quota reported (responses served from cache)"
+        return (
+            f"{self.property_id}: {snapshot['tokens_used']} tokens used by {snapshot['requests']} requests, "
+            f"{remaining.get('tokens_per_hour', '?')} left this hour, "
+            f"{remaining.get('tokens_per_day', '?')} left today"
+        )
+
+
+def get_scheduler(property_id: str) -> QuotaScheduler:
+    """Get the quota scheduler shared by all fetchers of a property."""
+    with _lock:
+        scheduler = _schedulers.get(property_id)
+        if scheduler is None:
+            scheduler = _schedulers[property_id] = QuotaScheduler(property_id)
+    return scheduler
+
+
+def all_schedulers() -> list[QuotaScheduler]:
+    """Get the schedulers of every property used in this process."""
+    with _lock:
+        return list(_schedulers.values())
@@ -0,0 +1,229 @@
+"""
+Resilient Call Module.
+Retries transient upstream failures with exponential backoff, jitter and
+per-service retry budgets.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import nullcontext
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+from google.api_core import exceptions as google_exceptions
+from google.genai import errors as genai_errors
+from googleapiclient.errors import HttpError
+from notion_client import APIErrorCode, APIResponseError
+from notion_client.errors import RequestTimeoutError
+
+from src.config import RETRY_BASE_DELAY, RETRY_BUDGETS, RETRY_MAX_ATTEMPTS, RETRY_MAX_DELAY
+
+# HTTP statuses worth retrying for the REST APIs (Search Console, Gemini)
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# gRPC errors worth retrying for the GA4 Data API; TooManyRequests (RESOURCE_EXHAUSTED)
+# is handled separately, as a used-up token quota does not refill within a backoff
+RETRYABLE_GOOGLE_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+
+# RESOURCE_EXHAUSTED messages of GA4 quotas that refill hourly or daily -> PropertyQuota field
+EXHAUSTED_QUOTA_MESSAGES = (
+    ('tokens per day', 'tokens_per_day'),
+    ('tokens per hour', 'tokens_per_hour'),
+    ('tokens per project per hour', 'tokens_per_project_per_hour'),
+    ('potentially thresholded requests per hour', 'potentially_thresholded_requests_per_hour'),
+)
+
+# Notion errors raised before a request takes effect; creating pages and
+# appending blocks are not idempotent, so internal server errors are not retried
+RETRYABLE_NOTION_CODES = {APIErrorCode.RateLimited, APIErrorCode.ServiceUnavailable}
+
+_lock = threading.Lock()
+
+# Service name -> retries left in this process
+_budgets = {}
+
+
+def _parse_retry_after(value) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_info_delay(error: Exception) -> Optional[float]:
+    """Get the delay a gRPC error's RetryInfo detail asks for, or None if it has none."""
+    for detail in getattr(error, 'details', None) or []:
+        retry_delay = getattr(detail, 'retry_delay', None)
+        if retry_delay is not None:
+            return max(0.0, retry_delay.seconds + retry_delay.nanos / 1e9)
+    return None
+
+
+def exhausted_quota(error: Exception) -> Optional[str]:
+    """Get the GA4 PropertyQuota field a RESOURCE_EXHAUSTED error reports as used up, or None."""
+    if not isinstance(error, google_exceptions.TooManyRequests):
+        return None
+    message = str(error).lower()
+    for phrase, field in EXHAUSTED_QUOTA_MESSAGES:
+        if phrase in message:
+            return field
+    return None
+
+
+def classify_error(error: Exception) -> tuple[bool, Optional[float]]:
+    """
+    Decide whether an upstream error is transient.
+
+    Returns:
+        Tuple of (retryable, seconds requested by a Retry-After header or None)
+    """
+    if isinstance(error, google_exceptions.TooManyRequests):
+        # Concurrent request limits clear within seconds; used-up token quotas
+        # do not, unless the server says when to come back
+        retry_after = _retry_info_delay(error)
+        return retry_after is not None or exhausted_quota(error) is None, retry_after
+
+    if isinstance(error, RETRYABLE_GOOGLE_ERRORS):
+        return True, None
+
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUSES, _parse_retry_after(error.resp.get('retry-after'))
+
+    if isinstance(error, genai_errors.APIError):
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        return error.code in RETRYABLE_STATUSES, _parse_retry_after(headers.get('retry-after'))
+
+    if isinstance(error, APIResponseError):
+        return error.code in RETRYABLE_NOTION_CODES, _parse_retry_after(error.headers.get('retry-after'))
+
+    if isinstance(error, (RequestTimeoutError, ConnectionError, TimeoutError)):
+        return True, None
+
+    return False, None
+
+
+def classify_rejected_error(error: Exception) -> tuple[bool, Optional[float]]:
+    """
+    Decide whether a call that is not idempotent can be retried safely.
+
+    Only errors raised before the request takes effect count as transient;
+    after a timeout the write may already have happened, so retrying could
+    repeat it.
+
+    Returns:
+        Tuple of (retryable, seconds requested by a Retry-After header or None)
+    """
+    if isinstance(error, APIResponseError):
+        return error.code in RETRYABLE_NOTION_CODES, _parse_retry_after(error.headers.get('retry-after'))
+    return False, None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Get the wait before retry number attempt (starting at 1).
+
+    Uses full jitter over an exponentially growing window capped at
+    RETRY_MAX_DELAY, and never waits less than a server's Retry-After.
+    """
+    window = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    delay = random.uniform(0, window)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, RETRY_MAX_DELAY))
+    return delay
+
+
+def _take_retry(service: str) -> bool:
+    """Spend one retry from a service's budget, or return False if it is used up."""
+    with _lock:
+        left = _budgets.setdefault(service, RETRY_BUDGETS.get(service, RETRY_MAX_ATTEMPTS))
+        if left <= 0:
+            return False
+        _budgets[service] = left - 1
+        return True
+
+
+def _next_delay(service: str, error: Exception, attempt: int, max_attempts: int,
+                classify: Callable = None) -> Optional[float]:
+    """Get the wait before retrying a failed call, or None if the error should be raised."""
+    retryable, retry_after = (classify or classify_error)(error)
+    if not retryable or attempt >= max_attempts or not _take_retry(service):
+        return None
+
+    delay = backoff_delay(attempt, retry_after)
+    print(f"🔁 {service} call failed ({type(error).__name__}: {error}), "
+          f"retrying in {delay:.1f}s (attempt {attempt + 1}/{max_attempts})")
+    return delay
+
+
+def call_with_retry(service: str, func: Callable, *args, max_attempts: int = None,
+                    classify: Callable = None, slot: Callable = None, **kwargs):
+    """
+    Call func, retrying transient failures.
+
+    Args:
+        service: Upstream service name, selecting the retry budget ('ga4', 'gsc',
+            'gemini', 'notion')
+        func: Callable performing one upstream call
+        max_attempts: Attempts per call including the first (default: RETRY_MAX_ATTEMPTS)
+        classify: Decides which errors are transient (default: classify_error;
+            use classify_rejected_error for calls that are not idempotent)
+        slot: Returns a context manager held during each attempt, e.g. a quota
+            slot; it is released while waiting to retry
+        *args, **kwargs: Passed through to func
+    """
+    max_attempts = max_attempts or RETRY_MAX_ATTEMPTS
+    slot = slot or nullcontext
+    attempt = 1
+    while True:
+        try:
+            with slot():
+                return func(*args, **kwargs)
+        except Exception as e:
+            delay = _next_delay(service, e, attempt, max_attempts, classify)
+            if delay is None:
+                raise
+        time.sleep(delay)
+        attempt += 1
+
+
+async def acall_with_retry(service: str, func: Callable, *args, max_attempts: int = None,
+                           classify: Callable = None, slot: Callable = None, **kwargs):
+    """
+    Await func(*args, **kwargs), retrying transient failures like call_with_retry().
+
+    slot, if given, returns an async context manager held during each attempt.
+    """
+    max_attempts = max_attempts or RETRY_MAX_ATTEMPTS
+    attempt = 1
+    while True:
+        try:
+            if slot is None:
+                return await func(*args, **kwargs)
+            async with slot():
+                return await func(*args, **kwargs)
+        except Exception as e:
+            delay = _next_delay(service, e, attempt, max_attempts, classify)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def retries_left() -> dict:
+    """Get the retry budget left per service for run output."""
+    with _lock:
+        return {service: _budgets.get(service, budget) for service, budget in RETRY_BUDGETS.items()}
@@ -0,0 +1,70 @@
+"""
+Sites Manifest Module.
+Loads the list of sites processed by the multi-site report runner.
+"""
+
+import json
+from pathlib import Path
+
+from src.config import NOTION_PARENT_PAGE_ID
+
+try:
+    import yaml
+except ImportError:  # YAML manifests are optional; JSON needs no extra dependency
+    yaml = None
+
+REQUIRED_SITE_KEYS = ('name', 'ga4_property_id', 'gsc_site_url')
+
+
+def load_sites_manifest(path) -> list[dict]:
+    """
+    Load and validate a sites manifest.
+
+    The manifest is a JSON (or, with PyYAML installed, YAML) document holding
+    either a list of sites or a {"sites": [...]} object. Each site needs a
+    unique 'name', a 'ga4_property_id' and a 'gsc_site_url';
+    'notion_parent_page_id' defaults to NOTION_PARENT_PAGE_ID and one of the
+    two must be set.
+
+    Args:
+        path: Manifest file path (.json, .yaml or .yml)
+
+    Returns:
+        List of site dicts in manifest order
+    """
+    path = Path(path)
+    text = path.read_text(encoding='utf-8')
+
+    if path.suffix in ('.yaml', '.yml'):
+        if yaml is None:
+            raise ValueError(f"Reading {path} requires PyYAML: pip install pyyaml")
+        manifest = yaml.safe_load(text)
+    else:
+        manifest = json.loads(text)
+
+    sites = manifest.get('sites', []) if isinstance(manifest, dict) else manifest
+    if not sites:
+        raise ValueError(f"No sites defined in {path}")
+
+    names = set()
+    for i, site in enumerate(sites):
+        missing = [key for key in REQUIRED_SITE_KEYS if not site.get(key)]
+        if missing:
+            raise ValueError(f"Site #{i + 1} in {path} is missing: {', '.join(missing)}")
+        if site['name'] in names:
+            raise ValueError(f"Duplicate site name in {path}: {site['name']}")
+        names.add(site['name'])
+
+        # Property IDs are naturally written as numbers in JSON and YAML
+        site['ga4_property_id'] = str(site['ga4_property_id'])
+        if not isinstance(site['gsc_site_url'], str):
+            raise ValueError(f"Site {site['name']} in {path}: gsc_site_url must be a string")
+
+        # Fail before any fetching rather than when the first report is published
+        site['notion_parent_page_id'] = site.get('notion_parent_page_id') or NOTION_PARENT_PAGE_ID
+        if not site['notion_parent_page_id']:
+            raise ValueError(
+                f"Site {site['name']} in {path} has no notion_parent_page_id and NOTION_PARENT_PAGE_ID is not set"
+            )
+
+    return sites
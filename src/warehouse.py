@@ -0,0 +1,147 @@
+"""
+Historical Metrics Warehouse Module.
+Stores day-level GA4 and Search Console metrics in SQLite so reports only
+fetch days that are missing or not yet final; periods are aggregated locally
+by src.aggregation.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.config import WAREHOUSE_PATH
+
+# Column name -> API metric for the additive day-level metrics kept per source.
+# Rate metrics are stored as weighted sums so period aggregates stay exact.
+GA4_DAILY_COLUMNS = {
+    'sessions': 'sessions',
+    'engaged_sessions': 'engagedSessions',
+    'screen_page_views': 'screenPageViews',
+    'new_users': 'newUsers',
+    'session_duration': 'averageSessionDuration',  # stored as average x sessions
+}
+GSC_DAILY_COLUMNS = {
+    'clicks': 'clicks',
+    'impressions': 'impressions',
+    'weighted_position': 'position',  # stored as position x impressions
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ga4_daily (
+    property TEXT NOT NULL,
+    date TEXT NOT NULL,
+    sessions REAL NOT NULL,
+    engaged_sessions REAL NOT NULL,
+    screen_page_views REAL NOT NULL,
+    new_users REAL NOT NULL,
+    session_duration REAL NOT NULL,
+    final INTEGER NOT NULL,
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (property, date)
+);
+CREATE TABLE IF NOT EXISTS gsc_daily (
+    site TEXT NOT NULL,
+    date TEXT NOT NULL,
+    clicks REAL NOT NULL,
+    impressions REAL NOT NULL,
+    weighted_position REAL NOT NULL,
+    final INTEGER NOT NULL,
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (site, date)
+);
+"""
+
+# Table name -> (entity column, metric columns)
+_TABLES = {
+    'ga4_daily': ('property', list(GA4_DAILY_COLUMNS)),
+    'gsc_daily': ('site', list(GSC_DAILY_COLUMNS)),
+}
+
+
+def date_span(start_date: str, end_date: str) -> list[str]:
+    """List every date from start_date to end_date inclusive (YYYY-MM-DD)."""
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    return [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((end - start).days + 1)]
+
+
+def is_final(date: str, final_after_days: int) -> bool:
+    """Check whether upstream data for a date can no longer change (more than final_after_days old)."""
+    day = datetime.strptime(date, '%Y-%m-%d').date()
+    return day < datetime.now().date() - timedelta(days=final_after_days)
+
+
+class Warehouse:
+    """Day-level metric store backed by SQLite."""
+    
+    def __init__(self, path: Path = None):
+        """
+        Initialize the warehouse, creating the database if needed.
+        
+        Args:
+            path: SQLite database file (default: WAREHOUSE_PATH)
+        """
+        self.path = Path(path or WAREHOUSE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+    
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call keeps the warehouse safe to use from threads
+        return sqlite3.connect(self.path, timeout=30)
+    
+    def missing_dates(self, table: str, entity: str, start_date: str, end_date: str) -> list[str]:
+        """
+        Get the dates in a range that are absent or were stored before becoming final.
+        
+        Args:
+            table: 'ga4_daily' or 'gsc_daily'
+            entity: GA4 property ID or Search Console site URL
+            start_date: First date (YYYY-MM-DD)
+            end_date: Last date (YYYY-MM-DD)
+        """
+        entity_column, _ = _TABLES[table]
+        with self._connect() as conn:
+            stored = {
+                date for (date,) in conn.execute(
+                    f"SELECT date FROM {table} WHERE {entity_column} = ? AND date BETWEEN ? AND ? AND final = 1",
+                    (entity, start_date, end_date)
+                )
+            }
+        return [date for date in date_span(start_date, end_date) if date not in stored]
+    
+    def upsert_days(self, table: str, entity: str, rows: list[dict], final_after_days: int):
+        """
+        Insert or replace day-level rows.
+        
+        Args:
+            table: 'ga4_daily' or 'gsc_daily'
+            entity: GA4 property ID or Search Console site URL
+            rows: Dicts with a 'date' key and one key per metric column
+            final_after_days: Days after which a date's data is final
+        """
+        entity_column, columns = _TABLES[table]
+        fetched_at = datetime.now().isoformat()
+        placeholders = ', '.join('?' * (len(columns) + 4))
+        
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({entity_column}, date, {', '.join(columns)}, final, fetched_at) "
+                f"VALUES ({placeholders})",
+                [
+                    (entity, row['date'], *(row[column] for column in columns),
+                     int(is_final(row['date'], final_after_days)), fetched_at)
+                    for row in rows
+                ]
+            )
+    
+    def daily_rows(self, table: str, entity: str, start_date: str, end_date: str) -> list[dict]:
+        """Get the stored day-level rows in a date range, ordered by date."""
+        entity_column, columns = _TABLES[table]
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"SELECT date, {', '.join(columns)} FROM {table} "
+                f"WHERE {entity_column} = ? AND date BETWEEN ? AND ? ORDER BY date",
+                (entity, start_date, end_date)
+            )
+            return [dict(zip(['date', *columns], values)) for values in cursor]